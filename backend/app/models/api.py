@@ -1,6 +1,7 @@
 from typing import Generic, TypeVar
 
 from pydantic import BaseModel
+from starlette.datastructures import URL
 
 T = TypeVar("T")
 
@@ -32,3 +33,27 @@ class PaginatedResponse(BaseModel, Generic[T]):
             "results": results[start:end],
         }
         return cls.model_validate(response)
+
+    @classmethod
+    def from_cursors(
+        cls,
+        results: list[T],
+        count: int,
+        next_cursor: str | None,
+        prev_cursor: str | None,
+        url: str,
+    ):
+        base_url = URL(url)
+        next_url, prev_url = None, None
+        if next_cursor is not None:
+            next_url = str(base_url.include_query_params(cursor=next_cursor))
+        if prev_cursor is not None:
+            prev_url = str(base_url.include_query_params(cursor=prev_cursor))
+
+        response = {
+            "count": count,
+            "next": next_url,
+            "previous": prev_url,
+            "results": results,
+        }
+        return cls.model_validate(response)
@@ -3,6 +3,7 @@
 import os
 from datetime import datetime, timedelta, timezone
 from enum import Enum
+from uuid import uuid4
 
 from jose import JWTError, jwt
 from pydantic import BaseModel
@@ -57,13 +58,44 @@ def get_expiry(token_type: TokenType):
 
 
 class Token(BaseModel):
-    """model representing the JWT data"""
+    """
+    model representing the JWT data
+
+    Access tokens also carry the user's ID and admin flag, so requests can be
+    authenticated without looking the user up by name (older tokens lack them).
+    Refresh tokens get a random ID (jti) so they can be revoked, and the ID of the
+    login they came from (sid), kept through every refresh, so logging out can
+    revoke every token of that login.
+    """
 
     username: str
     token_type: TokenType
-
-    def __init__(self, username: str, token_type: TokenType):
-        super().__init__(username=username, token_type=token_type)
+    user_id: int | None = None
+    admin: bool | None = None
+    issued_at: datetime | None = None
+    expires_at: datetime | None = None
+    jti: str | None = None
+    sid: str | None = None
+
+    def __init__(
+        self,
+        username: str,
+        token_type: TokenType,
+        user_id: int | None = None,
+        admin: bool | None = None,
+        **kwargs,
+    ):
+        if token_type == TokenType.REFRESH and "jti" not in kwargs:
+            kwargs["jti"] = str(uuid4())
+        if token_type == TokenType.REFRESH and "sid" not in kwargs:
+            kwargs["sid"] = str(uuid4())
+        super().__init__(
+            username=username,
+            token_type=token_type,
+            user_id=user_id,
+            admin=admin,
+            **kwargs,
+        )
 
     @staticmethod
     def from_jwt(token: str, token_type: TokenType):
@@ -72,27 +104,58 @@ class Token(BaseModel):
         jwt_payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
         username = jwt_payload.get("sub", None)
         tt = jwt_payload.get("token_type", None)
+        user_id = jwt_payload.get("uid", None)
+        admin = jwt_payload.get("admin", None)
+        jti = jwt_payload.get("jti", None)
+        sid = jwt_payload.get("sid", None)
         if (
             not isinstance(username, str)
             or not isinstance(tt, str)
             or tt != token_type.name
+            or not isinstance(user_id, int | None)
+            or not isinstance(admin, bool | None)
+            or not isinstance(jti, str | None)
+            or not isinstance(sid, str | None)
         ):
             raise JWTError("JWT Payload is malformed")
 
-        return Token(username, token_type)
+        return Token(
+            username,
+            token_type,
+            user_id,
+            admin,
+            issued_at=jwt_payload.get("iat", None),
+            expires_at=jwt_payload["exp"],
+            jti=jti,
+            sid=sid,
+        )
 
     def to_jwt(self):
         JWT_SECRET = get_secret(self.token_type)
         expiry = get_expiry(self.token_type)
 
-        expire = datetime.now(timezone.utc) + timedelta(seconds=expiry)
+        now = datetime.now(timezone.utc)
         jwt_payload = {
             "sub": self.username,
-            "exp": expire,
+            "iat": now,
+            "exp": now + timedelta(seconds=expiry),
             "token_type": self.token_type.name,
         }
+        if self.user_id is not None:
+            jwt_payload["uid"] = self.user_id
+        if self.admin is not None:
+            jwt_payload["admin"] = self.admin
+        if self.jti is not None:
+            jwt_payload["jti"] = self.jti
+        if self.sid is not None:
+            jwt_payload["sid"] = self.sid
         return jwt.encode(jwt_payload, JWT_SECRET, algorithm=ALGORITHM)
 
+    def seconds_left(self) -> float:
+        if self.expires_at is None:
+            return 0
+        return (self.expires_at - datetime.now(timezone.utc)).total_seconds()
+
 
 class AuthResponse(BaseModel):
     access_token: str
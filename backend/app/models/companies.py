@@ -1,3 +1,5 @@
+from enum import Enum
+
 from pydantic import BaseModel
 
 
@@ -13,3 +15,16 @@ class Company(BaseModel):
 
     def to_tuple(self):
         return (self.name, self.url, self.logo_url)
+
+
+class LogoStatus(str, Enum):
+    FOUND = "found"
+    MISSING = "missing"  # page has no logo
+    FAILED = "failed"  # page couldn't be fetched
+
+
+class LogoAttempt(BaseModel):
+    """outcome of scraping a company's logo"""
+
+    status: LogoStatus
+    content_hash: str | None = None
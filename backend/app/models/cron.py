@@ -0,0 +1,223 @@
+# pydantic models for routers/cron.py
+
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+
+class ListingSource(BaseModel):
+    """a GitHub-hosted JSON array of listings in (or mapped to) the SimplifyJobs format"""
+
+    name: str
+    urls: list[str] = Field(
+        description="Candidate URLs of the feed, tried in order until one exists"
+    )
+    fields: dict[str, str] = Field(
+        default={},
+        description="Feed field of each listing field that is named differently",
+    )
+    defaults: dict[str, Any] = Field(
+        default={}, description="Values of listing fields the feed leaves out"
+    )
+
+    def map_listing(self, raw_listing: dict) -> dict:
+        """renames and fills in the fields of a feed entry for ListingRecord.from_json"""
+        if self.fields:
+            renamed = {
+                ours: raw_listing[theirs]
+                for ours, theirs in self.fields.items()
+                if theirs in raw_listing
+            }
+            raw_listing = {**raw_listing, **renamed}
+        if self.defaults:
+            raw_listing = {**self.defaults, **raw_listing}
+        return raw_listing
+
+
+class FeedStatus(str, Enum):
+    CHANGED = "changed"
+    UNCHANGED = "unchanged"  # same as at the last successful ingest
+    FAILED = "failed"
+
+
+class FeedResult(BaseModel):
+    """how fetching one listing source went during an ingest"""
+
+    source: str
+    status: FeedStatus
+    url: str | None = None
+    listings: int = 0
+    duplicates: int = Field(
+        default=0, description="Listings dropped because an earlier source has them"
+    )
+    rekeyed: int = Field(
+        default=0,
+        description="Listings given a derived ID because another listing in the feed keeps their upstream ID",
+    )
+    seconds: float = 0
+    parse_seconds: float = 0
+    error: str | None = None
+
+
+class FeedState(BaseModel):
+    """upstream state of a listings feed as of an ingest"""
+
+    url: str
+    etag: str | None = None
+    content_hash: str
+
+
+class IngestSummary(BaseModel):
+    """number of listings written, skipped or moved in or out of the archive by an ingest"""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    archived: int = 0  # no longer in their feed
+    restored: int = 0  # back in a feed after being archived
+
+
+class IngestStrategy(str, Enum):
+    """how ingest writes listings: COPY into a staging table, or one upsert per row"""
+
+    COPY = "copy"
+    EXECUTEMANY = "executemany"
+
+
+class CategoryRule(BaseModel):
+    category: str
+    keywords: list[str]
+
+
+class ClassifierRules(BaseModel):
+    """category keyword rules, in priority order"""
+
+    version: str | None = Field(
+        default=None, description="Version of the rules in use (ignored in previews)"
+    )
+    rules: list[CategoryRule]
+    product_role_words: list[str]
+    default_category: str
+
+
+class CategoryShift(BaseModel):
+    from_category: str
+    to_category: str
+    count: int
+
+
+class ClassifierPreview(BaseModel):
+    """listing counts per category under the stored and the proposed rules"""
+
+    current: dict[str, int]
+    proposed: dict[str, int]
+    changed: int
+    shifts: list[CategoryShift]
+
+
+class CronStage(str, Enum):
+    RECLASSIFYING = "reclassifying"
+    FETCHING = "fetching"
+    CLASSIFYING = "classifying"
+    SCRAPING_LOGOS = "scraping logos"
+    ASSIGNING_COMPANIES = "assigning companies"
+    WRITING_LISTINGS = "writing listings"
+    WARMING_SNAPSHOT = "warming snapshot"
+    RETRYING_LOGOS = "retrying logos"
+    PRUNING_TOMBSTONES = "pruning tombstones"
+
+
+class CronRunStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    SKIPPED = "skipped"  # another ingest held the lock
+
+
+class CronResult(BaseModel):
+    """what an ingest run did; listings is None if no feed changed"""
+
+    reclassified: int = 0
+    feeds: list[FeedResult] = []
+    classified: int = 0
+    listings: IngestSummary | None = None
+    logos_found: int = 0
+    tombstones_pruned: int = 0
+
+
+class CronStageStats(BaseModel):
+    """resources one stage of an ingest run used, and the rows it took and produced"""
+
+    stage: CronStage
+    wall_seconds: float = 0
+    cpu_seconds: float = Field(
+        default=0, description="CPU time of the whole process, worker threads included"
+    )
+    peak_memory: int | None = Field(
+        default=None,
+        description="Peak bytes allocated by Python, if CRON_TRACE_MEMORY is set",
+    )
+    max_rss: int = Field(
+        default=0,
+        description="Process high-water resident set size at the end, in bytes",
+    )
+    rows_in: int | None = None
+    rows_out: int | None = None
+
+    @classmethod
+    def from_tuple(cls, row: tuple):
+        return cls(
+            stage=row[0],
+            wall_seconds=row[1],
+            cpu_seconds=row[2],
+            peak_memory=row[3],
+            max_rss=row[4],
+            rows_in=row[5],
+            rows_out=row[6],
+        )
+
+
+class CronStageReport(CronStageStats):
+    baseline: dict[str, float] = Field(
+        default={},
+        description="Median of each metric over the stage in recent successful runs",
+    )
+    regressions: list[str] = Field(
+        default=[], description="Metrics well above their baseline"
+    )
+
+
+class CronRun(BaseModel):
+    """an ingest run started by GET /cron/"""
+
+    id: int
+    status: CronRunStatus
+    stage: CronStage | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    result: CronResult | None = None
+    error: str | None = None
+
+    @classmethod
+    def from_tuple(cls, row: tuple):
+        return cls(
+            id=row[0],
+            status=row[1],
+            stage=row[2],
+            created_at=row[3],
+            started_at=row[4],
+            finished_at=row[5],
+            result=row[6],
+            error=row[7],
+        )
+
+
+class CronRunReport(CronRun):
+    """a cron run with the stats of each stage it went through"""
+
+    stages: list[CronStageReport] = []
+    regressed: bool = False
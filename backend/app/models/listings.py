@@ -1,8 +1,13 @@
+import base64
+import hashlib
+import sys
+from dataclasses import dataclass
 from datetime import datetime
+from enum import Enum
 from uuid import UUID
 from zoneinfo import ZoneInfo
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 pst = ZoneInfo("America/Los_Angeles")
 
@@ -24,28 +29,7 @@ class Listing(BaseModel):
     category: str
     faang_plus: bool
     company: Company
-
-    @staticmethod
-    def from_json(raw_listing: dict):
-        from ..util.cron import classifyFaangPlus, classifyJobCategory
-
-        parsed_json = raw_listing
-        parsed_json["date_posted"] = datetime.fromtimestamp(
-            raw_listing.get("date_posted", 0), tz=pst
-        )
-        parsed_json["date_updated"] = datetime.fromtimestamp(
-            raw_listing.get("date_updated", 0), tz=pst
-        )
-        parsed_json["category"] = classifyJobCategory(raw_listing)
-        parsed_json["faang_plus"] = classifyFaangPlus(raw_listing)
-
-        company_name = parsed_json["company_name"]
-        del parsed_json["company_name"]
-        company_url = parsed_json["company_url"]
-        del parsed_json["company_url"]
-        parsed_json["company"] = Company(name=company_name, url=company_url)
-
-        return Listing.model_validate(parsed_json)
+    archived: bool = False
 
     @classmethod
     def from_tuple(cls, row: tuple):
@@ -64,6 +48,78 @@ class Listing(BaseModel):
             category=row[11],
             faang_plus=row[12],
             company=Company(id=row[13], name=row[14], url=row[15], logo_url=row[16]),
+            archived=row[17],
+        )
+
+    def to_csv_row(self):
+        """flat row matching LISTING_CSV_HEADER, with lists joined by semicolons"""
+        return (
+            self.id,
+            self.source,
+            self.title,
+            self.active,
+            self.date_updated.isoformat(),
+            self.is_visible,
+            self.date_posted.isoformat(),
+            self.url,
+            ";".join(self.locations),
+            ";".join(self.terms),
+            self.sponsorship,
+            self.category,
+            self.faang_plus,
+            self.company.id,
+            self.company.name,
+            self.company.url,
+            self.company.logo_url,
+        )
+
+
+@dataclass(slots=True)
+class ListingRecord:
+    """compact listing parsed from the feed during ingest, before it is stored"""
+
+    id: UUID
+    source: str
+    title: str
+    active: bool
+    date_updated: datetime
+    is_visible: bool
+    date_posted: datetime
+    url: str
+    locations: list[str]
+    terms: list[str]
+    sponsorship: str
+    company_name: str
+    company_url: str
+    feed: str  # name of the ListingSource it came from
+    # set by classify_listings and assign_companies
+    category: str | None = None
+    faang_plus: bool | None = None
+    classifier_version: str | None = None
+    company_id: int | None = None
+
+    @classmethod
+    def from_json(cls, raw_listing: dict, feed: str):
+        # values repeated across listings share one string
+        return cls(
+            id=UUID(raw_listing["id"]),
+            source=sys.intern(raw_listing["source"]),
+            title=raw_listing["title"],
+            active=bool(raw_listing["active"]),
+            date_updated=datetime.fromtimestamp(
+                raw_listing.get("date_updated", 0), tz=pst
+            ),
+            is_visible=bool(raw_listing["is_visible"]),
+            date_posted=datetime.fromtimestamp(
+                raw_listing.get("date_posted", 0), tz=pst
+            ),
+            url=raw_listing["url"],
+            locations=[sys.intern(l) for l in raw_listing["locations"]],
+            terms=[sys.intern(t) for t in raw_listing["terms"]],
+            sponsorship=sys.intern(raw_listing["sponsorship"]),
+            company_name=sys.intern(raw_listing["company_name"]),
+            company_url=sys.intern(raw_listing["company_url"]),
+            feed=feed,
         )
 
     def to_tuple(self):
@@ -81,5 +137,167 @@ class Listing(BaseModel):
             self.sponsorship,
             self.category,
             self.faang_plus,
-            self.company.id,
+            self.company_id,
+            self.classifier_version,
+            self.feed,
+        )
+
+    def content_hash(self):
+        """
+        hash of the columns taken from the feed, to tell whether a row changed since
+        the last ingest (classification is kept current by reclassify_listings)
+        """
+        feed_columns = (
+            self.id,
+            self.source,
+            self.title,
+            self.active,
+            self.date_updated,
+            self.is_visible,
+            self.date_posted,
+            self.url,
+            self.locations,
+            self.terms,
+            self.sponsorship,
+            self.company_id,
+            self.feed,
+        )
+        return hashlib.blake2b(repr(feed_columns).encode(), digest_size=16).hexdigest()
+
+
+LISTING_CSV_HEADER = (
+    "id",
+    "source",
+    "title",
+    "active",
+    "date_updated",
+    "is_visible",
+    "date_posted",
+    "url",
+    "locations",
+    "terms",
+    "sponsorship",
+    "category",
+    "faang_plus",
+    "company_id",
+    "company_name",
+    "company_url",
+    "company_logo_url",
+)
+
+
+class ListingSort(str, Enum):
+    NEWEST = "newest"
+    UPDATED = "updated"
+    COMPANY = "company"
+    RELEVANCE = "relevance"
+
+
+class ListingFilters(BaseModel):
+    """query parameters narrowing down GET /listings (all optional)"""
+
+    # unknown parameters (e.g. the old page/page_size) are a 422, not silently ignored
+    model_config = ConfigDict(extra="forbid")
+
+    category: list[str] = []
+    faang_plus: bool | None = None
+    terms: list[str] = []
+    sponsorship: list[str] = []
+    active: bool | None = None
+    locations: list[str] = []
+    archived: bool = Field(
+        default=False,
+        description="List archived listings, which dropped out of their feed, instead of current ones.",
+    )
+    q: str | None = Field(
+        default=None,
+        description="Search over titles and company names, tolerant of typos. Results default to relevance order.",
+    )
+    sort: ListingSort = ListingSort.NEWEST
+
+    @model_validator(mode="after")
+    def resolve_sort(self):
+        if self.q is not None and not self.q.strip():
+            self.q = None
+        if self.q and "sort" not in self.model_fields_set:
+            self.sort = ListingSort.RELEVANCE
+        if self.sort == ListingSort.RELEVANCE and not self.q:
+            raise ValueError("Sorting by relevance requires a search query")
+        return self
+
+    def is_empty(self):
+        """whether no filter is applied (sort order aside)"""
+        applied = self.model_dump(
+            include=set(ListingFilters.model_fields),
+            exclude={"sort"},
+            exclude_defaults=True,
+        )
+        return not applied
+
+
+class ListingPageQuery(ListingFilters):
+    """query parameters for a page of GET /listings"""
+
+    cursor: str | None = None
+    pageSize: int = Field(default=100, ge=1, le=1000)
+
+
+class ListingFacets(BaseModel):
+    """number of listings per value of each filterable field"""
+
+    category: dict[str, int] = {}
+    terms: dict[str, int] = {}
+    sponsorship: dict[str, int] = {}
+    faang_plus: dict[str, int] = {}
+    company: dict[str, int] = {}
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple]):
+        """builds the facets from (facet, value, count) rows"""
+        facets = cls()
+        for facet, value, count in rows:
+            getattr(facets, facet)[value] = count
+        return facets
+
+
+class ListingChanges(BaseModel):
+    """listings changed since a data version; pass version as `since` next time"""
+
+    version: int
+    upserted: list[Listing]
+    removed: list[UUID]
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ListingExportQuery(ListingFilters):
+    """query parameters for GET /listings/export"""
+
+    format: ExportFormat = ExportFormat.NDJSON
+
+
+class ListingCursor(BaseModel):
+    """opaque keyset position (sort key, id) of a boundary row in a listing page"""
+
+    sort: ListingSort
+    key: str
+    id: UUID
+    backwards: bool = False
+
+    @classmethod
+    def from_str(cls, cursor: str):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            return cls.model_validate_json(base64.urlsafe_b64decode(padded))
+        except ValueError:
+            raise ValueError("Cursor is malformed")
+
+    def to_str(self):
+        return (
+            base64.urlsafe_b64encode(self.model_dump_json().encode())
+            .decode()
+            .rstrip("=")
         )
@@ -1,50 +1,68 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Cookie, Depends, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import JWTError
 
 from ..models.auth import AuthResponse, DBUser, Token, TokenType, get_expiry
 from ..util.auth import (
     create_user,
-    get_password_hash,
     get_user_from_db,
-    verify_password,
+    hash_password,
+    is_token_revoked,
+    revoke_token,
+    update_password_hash,
+    verify_and_update_password,
 )
+from ..util.ratelimit import IPRateLimit
 
 # --- router ---
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# per client IP; generous, as students on a campus network share one
+login_limit = IPRateLimit("login", limit=30, window=60)
+register_limit = IPRateLimit("register", limit=20, window=10 * 60)
+
 
 # --- api endpoints ---
 @router.post(
-    "/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED
+    "/register",
+    response_model=AuthResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(register_limit)],
 )
-def register_user(
+async def register_user(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], response: Response
 ):
-    if get_user_from_db(form_data.username):
+    # async so that bcrypt waits in its own pool without holding a request thread
+    if await run_in_threadpool(get_user_from_db, form_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered",
         )
 
-    hashed_password = get_password_hash(form_data.password)
+    hashed_password = await hash_password(form_data.password)
 
     new_user = DBUser(
         username=form_data.username, hashed_password=hashed_password, admin=False
     )
 
-    user_created = create_user(new_user)
+    user_id = await run_in_threadpool(create_user, new_user)
 
-    if not user_created:
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Could not create account (Database Error)",
         )
 
     # create and return tokens
-    access_token = Token(username=form_data.username, token_type=TokenType.ACCESS)
+    access_token = Token(
+        username=form_data.username,
+        token_type=TokenType.ACCESS,
+        user_id=user_id,
+        admin=new_user.admin,
+    )
     refresh_token = Token(username=form_data.username, token_type=TokenType.REFRESH)
     access_jwt = access_token.to_jwt()
     refresh_jwt = refresh_token.to_jwt()
@@ -61,19 +79,37 @@ def register_user(
     return AuthResponse(access_token=access_jwt, admin=new_user.admin)
 
 
-@router.post("/login", response_model=AuthResponse, status_code=status.HTTP_200_OK)
-def login_user(
+@router.post(
+    "/login",
+    response_model=AuthResponse,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(login_limit)],
+)
+async def login_user(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], response: Response
 ):
-    user = get_user_from_db(form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_in_threadpool(get_user_from_db, form_data.username)
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await verify_and_update_password(
+            form_data.password, user.hashed_password
+        )
+    if not user or not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
+    # the hash was made with outdated settings; store one made with the current ones
+    if new_hash is not None:
+        await run_in_threadpool(update_password_hash, user.id, new_hash)
 
     # create and return tokens
-    access_token = Token(username=form_data.username, token_type=TokenType.ACCESS)
+    access_token = Token(
+        username=form_data.username,
+        token_type=TokenType.ACCESS,
+        user_id=user.id,
+        admin=user.admin,
+    )
     refresh_token = Token(username=form_data.username, token_type=TokenType.REFRESH)
     access_jwt = access_token.to_jwt()
     refresh_jwt = refresh_token.to_jwt()
@@ -91,7 +127,19 @@ def login_user(
 
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-def logout_user(response: Response):
+def logout_user(
+    response: Response, refresh_token: Annotated[str | None, Cookie()] = None
+):
+    # revoke the refresh token and the login it belongs to, so neither a copy of it
+    # nor of any token it was refreshed from can be used either
+    if refresh_token is not None:
+        try:
+            token = Token.from_jwt(refresh_token, TokenType.REFRESH)
+        except JWTError:
+            token = None
+        if token is not None and token.jti is not None:
+            revoke_token(token)
+
     response.delete_cookie(key="refresh_token", path="/auth")
 
 
@@ -108,6 +156,9 @@ def refresh_token(
     try:
         token = Token.from_jwt(refresh_token, TokenType.REFRESH)
     except JWTError:
+        token = None
+    # tokens issued before they carried an ID can't be revoked, so aren't accepted
+    if token is None or token.jti is None or is_token_revoked(token):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token",
@@ -121,8 +172,19 @@ def refresh_token(
         )
 
     # create and return tokens
-    access_token = Token(username=user.username, token_type=TokenType.ACCESS)
-    new_refresh_token = Token(username=user.username, token_type=TokenType.REFRESH)
+    access_token = Token(
+        username=user.username,
+        token_type=TokenType.ACCESS,
+        user_id=user.id,
+        admin=user.admin,
+    )
+    # the new token stays part of the same login, so logging out revokes both; tokens
+    # from before logins had an ID start one with their own
+    new_refresh_token = Token(
+        username=user.username,
+        token_type=TokenType.REFRESH,
+        sid=token.sid or token.jti,
+    )
 
     access_jwt = access_token.to_jwt()
     refresh_jwt = new_refresh_token.to_jwt()
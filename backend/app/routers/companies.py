@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Request, status
+from fastapi import APIRouter, Request, Response, status
 
 from ..models.api import PaginatedResponse
 from ..models.companies import Company
-from ..util.companies import get_companies_from_db
+from ..util.companies import companies_snapshot
+from ..util.snapshot import PRERENDER_RESPONSES
 
 # --- router ---
 router = APIRouter(prefix="/companies", tags=["Companies"])
@@ -13,5 +14,14 @@ router = APIRouter(prefix="/companies", tags=["Companies"])
     "/", response_model=PaginatedResponse[Company], status_code=status.HTTP_200_OK
 )
 def get_companies(request: Request, page: int = 0, pageSize: int = 100):
-    companies = get_companies_from_db()
-    return PaginatedResponse.paginate(companies, page, pageSize, str(request.url))
+    url = str(request.url)
+    if not PRERENDER_RESPONSES:
+        companies = companies_snapshot.get()
+        return PaginatedResponse.paginate(companies, page, pageSize, url)
+
+    def render(companies: list[Company]):
+        response = PaginatedResponse[Company].paginate(companies, page, pageSize, url)
+        return response.model_dump_json().encode()
+
+    body = companies_snapshot.render(url, render)
+    return Response(content=body, media_type="application/json")
@@ -1,10 +1,16 @@
+import asyncio
 import os
 from typing import Annotated
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 
-from ..util.cron import assign_companies, get_listings, insert_listings
+from ..models.auth import User
+from ..models.cron import ClassifierPreview, ClassifierRules, CronRun, CronRunReport
+from ..util.auth import get_user
+from ..util.cron import get_classifier_rules, preview_classifier, run_ingest
+from ..util.jobs import get_run, get_run_reports, submit_run
 
 load_dotenv()
 
@@ -13,16 +19,102 @@ CRON_SECRET = os.getenv("CRON_SECRET")
 router = APIRouter(prefix="/cron", tags=["cron"])
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def scrape(Authorization: Annotated[str, Header()]):
+def verify_cron_secret(Authorization: Annotated[str, Header()]):
     if Authorization != f"Bearer {CRON_SECRET}":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized"
         )
 
-    # Get listings
-    listings = get_listings()
-    # Assign company logos to listings
-    assign_companies(listings)
-    # Insert listings into DB
-    insert_listings(listings)
+
+@router.get(
+    "/",
+    response_model=CronRun,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(verify_cron_secret)],
+)
+async def scrape(response: Response, wait: bool = False):
+    """
+    start an ingest in the background and return its run, to poll at /cron/jobs/{id}
+
+    Only one ingest runs at a time. While this worker has a run queued or in
+    progress, that run is returned instead of starting another; a run started while
+    another worker's is in progress is skipped. With `wait=true` the response is
+    sent once the run finishes, for hosts that stop work after responding.
+    """
+    run, job = await run_in_threadpool(submit_run, run_ingest)
+    if not wait:
+        return run
+
+    await asyncio.wrap_future(job)
+    response.status_code = status.HTTP_200_OK
+    return await run_in_threadpool(get_run, run.id)
+
+
+@router.get(
+    "/jobs/{run_id}",
+    response_model=CronRun,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(verify_cron_secret)],
+)
+def get_cron_run(run_id: int):
+    """get the stage an ingest run is at, or its result once finished"""
+    run = get_run(run_id)
+    if run is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No cron run with id {run_id}",
+        )
+    return run
+
+
+@router.get("/runs", response_model=list[CronRunReport], status_code=status.HTTP_200_OK)
+def get_cron_runs(
+    user: Annotated[User, Depends(get_user)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    """
+    get the latest cron runs, newest first, with the time, memory and rows of each stage
+
+    Each stage is compared to its median over recent successful runs; metrics well
+    above it are listed under `regressions`, and the run is flagged as `regressed`.
+    """
+    if not user.admin:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Need to be administrator to view cron runs",
+        )
+    return get_run_reports(limit)
+
+
+@router.get(
+    "/classifier", response_model=ClassifierRules, status_code=status.HTTP_200_OK
+)
+def get_classifier(user: Annotated[User, Depends(get_user)]):
+    """get the category keyword rules listings are classified by"""
+    if not user.admin:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Need to be administrator to view classifier rules",
+        )
+    return get_classifier_rules()
+
+
+@router.post(
+    "/classifier/preview",
+    response_model=ClassifierPreview,
+    status_code=status.HTTP_200_OK,
+)
+def preview_classifier_rules(
+    rules: ClassifierRules, user: Annotated[User, Depends(get_user)]
+):
+    """
+    preview how current listings would be recategorized under proposed rules
+
+    Start from GET /cron/classifier and edit the rules; nothing is changed.
+    """
+    if not user.admin:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Need to be administrator to preview classifier rules",
+        )
+    return preview_classifier(rules)
@@ -11,13 +11,21 @@ from ..util.favorites import (
     get_favorites_from_db,
     save_favorite_to_db,
 )
+from ..util.ratelimit import UserRateLimit
 
 # --- router ---
 router = APIRouter(prefix="/favorites", tags=["Favorites"])
 
+# adding and removing favorites share one limit per user
+favorite_limit = UserRateLimit("favorites", limit=60, window=60)
+
 
 # --- api endpoints ---
-@router.post("/{listing_id}", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{listing_id}",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(favorite_limit)],
+)
 def favorite_listing(listing_id: UUID, user: Annotated[User, Depends(get_user)]):
     user_id = user.id
     assert user_id is not None
@@ -38,7 +46,11 @@ def get_favorites(user: Annotated[User, Depends(get_user)]):
     return favorites
 
 
-@router.delete("/{listing_id}", status_code=status.HTTP_200_OK)
+@router.delete(
+    "/{listing_id}",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(favorite_limit)],
+)
 def unfavorite_listing(listing_id: UUID, user: Annotated[User, Depends(get_user)]):
     user_id = user.id
     assert user_id is not None
@@ -7,6 +7,7 @@ from ..models.auth import User
 from ..util.auth import get_user
 from ..util.images import ImageMiddleware, delete_object, put_object
 from ..util.profile import get_profile_id, update_profile_image
+from ..util.ratelimit import UserRateLimit
 
 # --- router ---
 router = APIRouter(prefix="/images", tags=["Images"])
@@ -14,9 +15,11 @@ router = APIRouter(prefix="/images", tags=["Images"])
 MAX_PROFILE_FILE_SIZE = 4.5 * 1024 * 1024  # 4.5 MB
 PROFILE_BUCKET = "profiles"
 
+# checked before the upload is read, by the route class of PUT /images/profile
+profile_image_limit = UserRateLimit("profile image", limit=10, window=10 * 60)
+
 
 # --- api endpoints ---
-@router.put("/profile", status_code=status.HTTP_200_OK)
 async def put_profile_image(
     user: Annotated[User, Depends(get_user)],
     buf: Annotated[BytesIO, Depends(ImageMiddleware(MAX_PROFILE_FILE_SIZE))],
@@ -37,6 +40,15 @@ async def put_profile_image(
     return url
 
 
+router.add_api_route(
+    "/profile",
+    put_profile_image,
+    methods=["PUT"],
+    status_code=status.HTTP_200_OK,
+    route_class_override=profile_image_limit.route_class(),
+)
+
+
 @router.delete("/profile", status_code=status.HTTP_200_OK)
 async def delete_profile_image(user: Annotated[User, Depends(get_user)]):
     profile_id = get_profile_id(user.username)
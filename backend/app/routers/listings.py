@@ -1,25 +1,167 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from ..models.api import PaginatedResponse
 from ..models.auth import User
-from ..models.listings import Listing
+from ..models.listings import (
+    ExportFormat,
+    Listing,
+    ListingChanges,
+    ListingCursor,
+    ListingExportQuery,
+    ListingFacets,
+    ListingFilters,
+    ListingPageQuery,
+    ListingSort,
+)
 from ..util.auth import get_user
-from ..util.listings import delete_listing_in_db, get_listings_from_db
+from ..util.listings import (
+    SortedListings,
+    count_facets_in_db,
+    count_listings_in_db,
+    delete_listing_in_db,
+    export_listings_csv,
+    export_listings_ndjson,
+    facets_snapshot,
+    get_listing_changes_from_db,
+    get_listings_page_from_db,
+    hold_export_slot,
+    listings_snapshot,
+)
+from ..util.snapshot import PRERENDER_RESPONSES
 
 # --- router ---
 router = APIRouter(prefix="/listings", tags=["Listings"])
 
 
+# --- helpers ---
+def parse_cursor(query: ListingPageQuery):
+    try:
+        cursor = ListingCursor.from_str(query.cursor) if query.cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    if cursor is not None and cursor.sort != query.sort:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not match the sort order",
+        )
+    return cursor
+
+
+def get_snapshot_page(snapshot: SortedListings, query: ListingPageQuery, url: str):
+    listings, next_cursor, prev_cursor = snapshot.page(
+        query.pageSize, parse_cursor(query)
+    )
+    return PaginatedResponse[Listing].from_cursors(
+        listings,
+        len(snapshot),
+        next_cursor.to_str() if next_cursor else None,
+        prev_cursor.to_str() if prev_cursor else None,
+        url,
+    )
+
+
 # --- api endpoints ---
 @router.get(
     "/", response_model=PaginatedResponse[Listing], status_code=status.HTTP_200_OK
 )
-def get_listings(request: Request, page: int = 0, pageSize: int = 100):
-    listings = get_listings_from_db()
-    return PaginatedResponse.paginate(listings, page, pageSize, str(request.url))
+def get_listings(request: Request, query: Annotated[ListingPageQuery, Query()]):
+    """
+    get a page of listings matching the filters, in the requested sort order
+
+    Follow the `next`/`previous` links to move between pages; their cursors are opaque.
+    List filters (e.g. `category`, `terms`, `locations`) match any of the given values.
+    """
+    url = str(request.url)
+
+    # the default view is served from memory between ingests
+    if query.is_empty() and query.sort == ListingSort.NEWEST:
+        if not PRERENDER_RESPONSES:
+            return get_snapshot_page(listings_snapshot.get(), query, url)
+
+        def render(snapshot: SortedListings):
+            return get_snapshot_page(snapshot, query, url).model_dump_json().encode()
+
+        body = listings_snapshot.render(url, render)
+        return Response(content=body, media_type="application/json")
+
+    cursor = parse_cursor(query)
+    listings, next_cursor, prev_cursor = get_listings_page_from_db(
+        query, query.pageSize, cursor
+    )
+    return PaginatedResponse[Listing].from_cursors(
+        listings,
+        count_listings_in_db(query),
+        next_cursor.to_str() if next_cursor else None,
+        prev_cursor.to_str() if prev_cursor else None,
+        url,
+    )
+
+
+@router.get("/facets", response_model=ListingFacets, status_code=status.HTTP_200_OK)
+def get_listing_facets(filters: Annotated[ListingFilters, Query()]):
+    """
+    get the number of listings per category, term, sponsorship, FAANG+ flag and company
+
+    With filters, counts are limited to matching listings. Each facet ignores its own
+    filter, so it shows how the other values would narrow the current selection.
+    """
+    if filters.is_empty():
+        return facets_snapshot.get()
+    return count_facets_in_db(filters)
+
+
+@router.get("/changes", response_model=ListingChanges, status_code=status.HTTP_200_OK)
+def get_listing_changes(since: Annotated[int, Query(ge=0)] = 0):
+    """
+    get listings added or updated, and IDs of listings removed, after data version `since`
+
+    Keep the returned `version` and pass it as `since` on the next sync.
+    `since=0` returns every listing. A `since` older than the removals kept gets a
+    410; drop the local copy and sync again from `since=0`.
+    """
+    changes = get_listing_changes_from_db(since)
+    if changes is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Changes since this version are no longer kept, sync from since=0",
+        )
+    return changes
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_listings(query: Annotated[ListingExportQuery, Query()]):
+    """
+    stream every listing matching the filters as NDJSON or CSV
+
+    Accepts the same filters and sort orders as GET /listings, without pagination.
+    Only a few exports run at once; past that the response is a 503 with Retry-After.
+    """
+    match query.format:
+        case ExportFormat.NDJSON:
+            content, media_type = export_listings_ndjson(query), "application/x-ndjson"
+        case ExportFormat.CSV:
+            content, media_type = export_listings_csv(query), "text/csv"
+
+    content = hold_export_slot(content)
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports at once, try again shortly",
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="listings.{query.format.value}"'
+        },
+    )
 
 
 @router.delete("/{listing_id}", status_code=status.HTTP_200_OK)
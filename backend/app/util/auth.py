@@ -1,3 +1,9 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
 import psycopg
@@ -6,20 +12,90 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from passlib.context import CryptContext
 
-from ..models.auth import DBUser, Token, TokenType, User
+from ..models.auth import (
+    ACCESS_TOKEN_EXPIRE_SECONDS,
+    REFRESH_TOKEN_EXPIRE_SECONDS,
+    DBUser,
+    Token,
+    TokenType,
+    User,
+)
+from ..util.bloom import BloomFilter
+from ..util.cache import TTLCache
 from ..util.db import get_db_connection
 
 # --- hashing ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# hashes with fewer rounds than BCRYPT_ROUNDS are rehashed when their user next logs in
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+# bcrypt runs in its own pool so a burst of logins can't take every request thread;
+# once PASSWORD_HASH_QUEUE calls are waiting on top of the running ones, the rest get a 503
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // 2)))
+)
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# --- caches ---
+# verified access tokens, kept until they expire so repeat requests skip the signature check
+verified_tokens: TTLCache[str, Token] = TTLCache(
+    max_size=10000, ttl=ACCESS_TOKEN_EXPIRE_SECONDS
+)
+# users behind access tokens, cached per worker process and never invalidated: a user
+# deleted or made or unmade administrator (in psql; no route changes either) is served
+# as they were for up to PRINCIPAL_TTL_SECONDS, so a demoted admin keeps admin access
+# until then, after which their access token no longer matches and is rejected
+PRINCIPAL_TTL_SECONDS = 60
+principals: TTLCache[int, User] = TTLCache(max_size=10000, ttl=PRINCIPAL_TTL_SECONDS)
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+# --- revoked refresh tokens ---
+# a Bloom filter of revoked token IDs, so only a refresh whose token might be revoked is
+# checked against the database; revocations made by other workers reach this worker's
+# filter when it is rebuilt, every REVOCATION_REBUILD_SECONDS
+REVOCATION_REBUILD_SECONDS = 60
+REVOCATION_ERROR_RATE = 0.001
+_revoked: BloomFilter | None = None
+_revoked_built_at = 0.0
+_revoked_lock = threading.Lock()
 
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+async def run_hash(fn, *args):
+    """runs fn in the password hashing pool, or raises 503 if its queue is full"""
+    if not hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins at once, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    future = hash_executor.submit(fn, *args)
+    # the slot is held until bcrypt finishes, even if the request is cancelled
+    future.add_done_callback(lambda _: hash_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password(password: str) -> str:
+    return await run_hash(pwd_context.hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    checks a password against its hash, also returning a new hash if the stored one
+    uses outdated pwd_context settings
+    """
+    return await run_hash(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
 
 def get_user_from_db(username: str):
@@ -40,8 +116,46 @@ def get_user_from_db(username: str):
     return None
 
 
+def update_password_hash(user_id: int, hashed_password: str):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE users SET hashed_password = %s WHERE id = %s",
+                (hashed_password, user_id),
+            )
+        conn.commit()
+
+
+def get_user_by_id_from_db(user_id: int):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, username, admin FROM users WHERE id = %s", (user_id,)
+            )
+            user_record = cur.fetchone()
+            if user_record:
+                return User(
+                    id=user_record[0], username=user_record[1], admin=user_record[2]
+                )
+    return None
+
+
+def get_principal(user_id: int):
+    """gets a user by ID, from the principal cache if read within PRINCIPAL_TTL_SECONDS"""
+    user = principals.get(user_id)
+    if user is None:
+        user = get_user_by_id_from_db(user_id)
+        if user is not None:
+            principals.set(user_id, user)
+    return user
+
+
 def create_user(user: DBUser):
-    """creates new user and creates an empty profile for them (for profiles)"""
+    """
+    creates new user and creates an empty profile for them (for profiles)
+
+    returns the new user's ID, or None if they couldn't be created
+    """
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
@@ -55,19 +169,99 @@ def create_user(user: DBUser):
                 )
                 user_row = cur.fetchone()
                 if not user_row:
-                    return False
+                    return None
 
                 # create empty profile
                 user_id = user_row[0]
                 cur.execute("INSERT INTO profiles (user_id) VALUES (%s)", (user_id,))
 
             conn.commit()
-            return True
+            return user_id
 
     except psycopg.Error as e:
         print(f"Database Error in create_user: {e}")
+        return None
+
+
+def load_revoked_tokens() -> BloomFilter:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # expired tokens are refused anyway
+            cur.execute("DELETE FROM revoked_tokens WHERE expires_at <= NOW()")
+            cur.execute("SELECT jti FROM revoked_tokens")
+            jtis = [str(row[0]) for row in cur.fetchall()]
+        conn.commit()
+
+    # with room for the revocations made here before the next rebuild
+    revoked = BloomFilter(
+        capacity=2 * len(jtis) + 1000, error_rate=REVOCATION_ERROR_RATE
+    )
+    for jti in jtis:
+        revoked.add(jti)
+    return revoked
+
+
+def get_revoked_tokens() -> BloomFilter:
+    """gets the revoked token filter, rebuilding it at most every REVOCATION_REBUILD_SECONDS"""
+    global _revoked, _revoked_built_at
+    with _revoked_lock:
+        if (
+            _revoked is None
+            or time.monotonic() - _revoked_built_at >= REVOCATION_REBUILD_SECONDS
+        ):
+            _revoked = load_revoked_tokens()
+            _revoked_built_at = time.monotonic()
+        return _revoked
+
+
+def revoke_token(token: Token):
+    """
+    revokes a refresh token until it expires, along with every other token of its
+    login: ones it was refreshed from, and any a copy of it was refreshed into
+    """
+    # a login can be refreshed until its last token expires, at most a full
+    # refresh token lifetime from now
+    login_expires_at = datetime.now(timezone.utc) + timedelta(
+        seconds=REFRESH_TOKEN_EXPIRE_SECONDS
+    )
+    revoked = [(token.jti, token.expires_at)]
+    if token.sid is not None:
+        revoked.append((token.sid, login_expires_at))
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO revoked_tokens (jti, expires_at) VALUES (%s, %s)
+                ON CONFLICT (jti) DO UPDATE
+                    SET expires_at = GREATEST(
+                        revoked_tokens.expires_at, EXCLUDED.expires_at
+                    )
+                """,
+                revoked,
+            )
+        conn.commit()
+
+    # after the commit, so a rebuild that misses the rows comes before this
+    with _revoked_lock:
+        if _revoked is not None:
+            for id, _ in revoked:
+                _revoked.add(id)
+
+
+def is_token_revoked(token: Token) -> bool:
+    """whether a refresh token, or the login it belongs to, was revoked"""
+    ids = [id for id in (token.jti, token.sid) if id is not None]
+    revoked = get_revoked_tokens()
+    if not any(id in revoked for id in ids):
         return False
 
+    # revoked, or a false positive of the filter
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM revoked_tokens WHERE jti = ANY(%s)", (ids,))
+            return cur.fetchone() is not None
+
 
 def get_user(token: Annotated[str, Depends(oauth2_scheme)]):
     credentials_exception = HTTPException(
@@ -75,12 +269,28 @@ def get_user(token: Annotated[str, Depends(oauth2_scheme)]):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        jwt_token = Token.from_jwt(token, TokenType.ACCESS)
-    except JWTError:
-        raise credentials_exception
+    jwt_token = verified_tokens.get(token)
+    if jwt_token is None:
+        try:
+            jwt_token = Token.from_jwt(token, TokenType.ACCESS)
+        except JWTError:
+            raise credentials_exception
+        verified_tokens.set(token, jwt_token, ttl=jwt_token.seconds_left())
+
+    # tokens issued before they carried the user's ID
+    if jwt_token.user_id is None:
+        db_user = get_user_from_db(jwt_token.username)
+        if db_user is None:
+            raise credentials_exception
+        return User.model_validate(db_user.model_dump(exclude={"hashed_password"}))
 
-    db_user = get_user_from_db(jwt_token.username)
-    if db_user is None:
+    user = get_principal(jwt_token.user_id)
+    # the user was deleted, or renamed or had their admin flag changed since the
+    # token was issued: the client has to refresh it
+    if (
+        user is None
+        or user.username != jwt_token.username
+        or user.admin != jwt_token.admin
+    ):
         raise credentials_exception
-    return User.model_validate(db_user.model_dump(exclude={"hashed_password"}))
+    return user
@@ -1,5 +1,6 @@
 from ..models.companies import Company
 from .db import get_db_connection
+from .snapshot import Snapshot
 
 
 def get_companies_from_db():
@@ -15,3 +16,7 @@ def get_companies_from_db():
 
             companies = [Company.from_tuple(row) for row in rows]
             return companies
+
+
+# companies only change during ingest, so they are kept per data version
+companies_snapshot = Snapshot(get_companies_from_db)
@@ -1,15 +1,48 @@
+import hashlib
+import io
+import json
 import os
-from datetime import datetime
-from uuid import uuid4
+import re
+import tempfile
+import time
+import traceback
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import IO, Iterable, Iterator
+from urllib.parse import urlsplit
+from uuid import UUID, uuid5
 
+import psycopg
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
-from ..models.companies import Company
-from ..models.listings import Listing
+from ..models.companies import Company, LogoAttempt, LogoStatus
+from ..models.cron import (
+    CategoryRule,
+    CategoryShift,
+    ClassifierPreview,
+    ClassifierRules,
+    CronResult,
+    CronRunStatus,
+    CronStage,
+    FeedResult,
+    FeedState,
+    FeedStatus,
+    IngestStrategy,
+    IngestSummary,
+    ListingSource,
+)
+from ..models.listings import ListingRecord
 from .companies import get_companies_from_db
 from .db import get_db_connection
+from .jobs import finish_run, ingest_lock, run_stage, start_run, trace_memory
+from .listings import listings_snapshot, prune_tombstones_in_db, refresh_facets_in_db
+from .snapshot import bump_data_version, set_data_version
 
 load_dotenv()
 
@@ -19,16 +52,40 @@ headers = {
     "Authorization": f"Bearer {GITHUB_TOKEN}",
 }
 
+# how insert_listings writes to the DB (see IngestStrategy)
+INGEST_STRATEGY = IngestStrategy(os.getenv("INGEST_STRATEGY", "copy"))
+# concurrent logo scrapes, seconds between requests to one host, and (connect, read) timeout
+SCRAPE_WORKERS = 8
+SCRAPE_HOST_INTERVAL = 0.2
+SCRAPE_TIMEOUT = (5, 15)
+SIMPLIFY_COMPANY_URL = "https://simplify.jobs/c/"
+# companies whose missing logo is retried per ingest, and the first wait before a retry
+LOGO_RETRY_BUDGET = 50
+LOGO_RETRY_BACKOFF = {
+    LogoStatus.FAILED: timedelta(hours=1),
+    LogoStatus.MISSING: timedelta(days=1),
+}
+LOGO_RETRY_MAX_BACKOFF = timedelta(days=30)
+# stored listings reclassified per transaction after the category rules change
+RECLASSIFY_BATCH_SIZE = 5000
+# listings.json of a SimplifyJobs repo, and the (connect, read) timeout of a feed request
+SIMPLIFY_LISTINGS_URL = "https://api.github.com/repos/SimplifyJobs/{repo}/contents/.github/scripts/listings.json"
+FEED_TIMEOUT = (5, 60)
+# bytes read at a time while downloading and decoding a feed
+CHUNK_SIZE = 1 << 16
+# whitespace and commas between the items of a JSON array
+ARRAY_SEPARATORS = re.compile(r"[ \t\n\r,]*")
+# what can follow an item of a JSON array
+ITEM_TERMINATORS = frozenset(" \t\n\r,]")
 
-# Classifies a listing into a category
-def classifyJobCategory(job):
-    # Always classify by title for better accuracy, ignore existing category
-    title = job.get("title", "").lower()
 
+# Category keyword rules, in priority order: a title gets the first category
+# with any of its keywords as a substring
+CATEGORY_RULES = [
     # Filter out IT technical support roles that aren't really tech internships
-    if any(
-        term in title
-        for term in [
+    (
+        "IT Technical Support",
+        [
             "it technical intern",
             "it technician",
             "it support",
@@ -40,14 +97,12 @@ def classifyJobCategory(job):
             "security operations",
             "field operations",
             "information technology",
-        ]
-    ):
-        return "IT Technical Support"
-
+        ],
+    ),
     # Hardware (first priority) - expanded keywords
-    if any(
-        term in title
-        for term in [
+    (
+        "Hardware Engineering",
+        [
             "hardware",
             "embedded",
             "fpga",
@@ -71,14 +126,12 @@ def classifyJobCategory(job):
             "power",
             "rf",
             "antenna",
-        ]
-    ):
-        return "Hardware Engineering"
-
+        ],
+    ),
     # Quant (second priority) - expanded keywords
-    elif any(
-        term in title
-        for term in [
+    (
+        "Quantitative Finance",
+        [
             "quant",
             "quantitative",
             "trading",
@@ -94,14 +147,12 @@ def classifyJobCategory(job):
             "equity",
             "fixed income",
             "credit",
-        ]
-    ):
-        return "Quantitative Finance"
-
+        ],
+    ),
     # Data Science (third priority) - expanded keywords
-    elif any(
-        term in title
-        for term in [
+    (
+        "Data Science, AI & Machine Learning",
+        [
             "data science",
             "artificial intelligence",
             "data scientist",
@@ -130,14 +181,12 @@ def classifyJobCategory(job):
             "big data",
             "spark",
             "hadoop",
-        ]
-    ):
-        return "Data Science, AI & Machine Learning"
-
+        ],
+    ),
     # Product (fourth priority) - check before Software to catch "Software Product Management" roles
-    elif any(
-        term in title
-        for term in [
+    (
+        "Product Management",
+        [
             "product manag",
             "product analyst",
             "apm",
@@ -149,94 +198,16 @@ def classifyJobCategory(job):
             "business analyst",
             "program manag",
             "project manag",
-        ]
-    ) or (
-        "product" in title
-        and any(
-            word in title for word in ["analyst", "manager", "associate", "coordinator"]
-        )
-    ):
-        return "Product Management"
-
-    # Software Engineering (fifth priority) - greatly expanded keywords
-    elif any(
-        term in title
-        for term in [
-            "software",
-            "engineer",
-            "developer",
-            "dev",
-            "programming",
-            "coding",
-            "fullstack",
-            "full-stack",
-            "full stack",
-            "frontend",
-            "front end",
-            "front-end",
-            "backend",
-            "back end",
-            "back-end",
-            "mobile",
-            "web",
-            "app",
-            "application",
-            "platform",
-            "infrastructure",
-            "cloud",
-            "devops",
-            "sre",
-            "site reliability",
-            "systems",
-            "network",
-            "security",
-            "cybersecurity",
-            "qa",
-            "quality assurance",
-            "test",
-            "automation",
-            "ci/cd",
-            "deployment",
-            "kubernetes",
-            "docker",
-            "aws",
-            "azure",
-            "gcp",
-            "api",
-            "microservices",
-            "database",
-            "java",
-            "python",
-            "javascript",
-            "react",
-            "node",
-            "golang",
-            "rust",
-            "c++",
-            "c#",
-            ".net",
-            "ios",
-            "android",
-            "flutter",
-            "technical",
-            "technology",
-            "tech",
-            "coding",
-            "programming",
-            "sde",
-            "swe",
-        ]
-    ):
-        return "Software Engineering"
-
-    # Return None for jobs that don't fit any category (will be filtered out)
-    else:
-        return "Software Engineering"
-
+        ],
+    ),
+]
+# "product" together with one of these words also makes a title Product Management
+PRODUCT_ROLE_WORDS = ["analyst", "manager", "associate", "coordinator"]
+# Titles matching no rule (anything software, and everything else)
+DEFAULT_CATEGORY = "Software Engineering"
 
-# Classifies a listing as FAANG+
-def classifyFaangPlus(job):
-    FAANG_PLUS = {
+FAANG_PLUS = frozenset(
+    [
         "airbnb",
         "adobe",
         "amazon",
@@ -296,74 +267,794 @@ def classifyFaangPlus(job):
         "visa",
         "waymo",
         "x",
-    }
+    ]
+)
+
+
+# Stored with each listing's category and FAANG+ flag; changes whenever the rules above do
+CLASSIFIER_VERSION = hashlib.sha256(
+    json.dumps(
+        [CATEGORY_RULES, PRODUCT_ROLE_WORDS, DEFAULT_CATEGORY, sorted(FAANG_PLUS)]
+    ).encode()
+).hexdigest()[:16]
+
+
+# Compiles keywords into one regex that finds any of them as a substring
+# Shared prefixes are merged into a trie, so each position is tried once per branch
+def compile_keywords(keywords: list[str]) -> re.Pattern:
+    if not keywords:
+        return re.compile("(?!)")
+
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def to_regex(node: dict) -> str:
+        # A keyword ends here, so longer ones sharing its prefix add nothing
+        if "" in node:
+            return ""
+        branches = [re.escape(char) + to_regex(child) for char, child in node.items()]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return re.compile(to_regex(trie))
+
+
+# Category keyword rules compiled for matching titles
+class CategoryClassifier:
+    def __init__(
+        self,
+        rules: list[tuple[str, list[str]]],
+        product_role_words: list[str],
+        default_category: str,
+    ):
+        rules = [
+            (category, [k.lower() for k in keywords]) for category, keywords in rules
+        ]
+        self.patterns = [
+            (category, compile_keywords(keywords)) for category, keywords in rules
+        ]
+        # Most titles match no rule, which one scan for every keyword rules out
+        self.any_pattern = compile_keywords(
+            [keyword for _, keywords in rules for keyword in keywords]
+        )
+        self.product_role_words = [word.lower() for word in product_role_words]
+        self.default_category = default_category
+
+    # Classifies a lowercase title
+    def classify(self, title: str) -> str:
+        if self.any_pattern.search(title):
+            for category, pattern in self.patterns:
+                if pattern.search(title):
+                    return category
+        if "product" in title and any(
+            word in title for word in self.product_role_words
+        ):
+            return "Product Management"
+        return self.default_category
+
+
+category_classifier = CategoryClassifier(
+    CATEGORY_RULES, PRODUCT_ROLE_WORDS, DEFAULT_CATEGORY
+)
+
+
+# Classifies a listing into a category
+def classifyJobCategory(job):
+    # Always classify by title for better accuracy, ignore existing category
+    return category_classifier.classify(job.get("title", "").lower())
+
+
+# Classifies a listing as FAANG+
+def classifyFaangPlus(job):
     return job.get("company_name", "").lower() in FAANG_PLUS
 
 
-# Gets listings from the GitHub API
-def get_listings():
+# Classifies listings, reusing the stored category of titles these rules already classified
+# Returns the number of titles that had to be classified
+def classify_listings(
+    listings: list[ListingRecord], categories: dict[str, str] | None = None
+) -> int:
+    if categories is None:
+        categories = get_known_categories()
+    known = len(categories)
+    for listing in listings:
+        category = categories.get(listing.title)
+        if category is None:
+            category = classifyJobCategory({"title": listing.title})
+            categories[listing.title] = category
+        listing.category = category
+        listing.faang_plus = classifyFaangPlus({"company_name": listing.company_name})
+        listing.classifier_version = CLASSIFIER_VERSION
+    return len(categories) - known
+
+
+# Gets the category of each stored title classified by the current rules
+def get_known_categories() -> dict[str, str]:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT DISTINCT title, category
+                FROM listings
+                WHERE classifier_version = %s;
+                """,
+                (CLASSIFIER_VERSION,),
+            )
+            return dict(cur.fetchall())
+
+
+# Reclassifies stored listings in batches if the rules changed since they were classified
+# Returns the number of listings whose category or FAANG+ flag changed
+def reclassify_listings(batch_size: int = RECLASSIFY_BATCH_SIZE) -> int:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT classifier_version FROM listings_state;")
+            if cur.fetchone()[0] == CLASSIFIER_VERSION:
+                return 0
+
+    changed = 0
+    last_id = None
+    while True:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT l.id, l.title, c.name, l.category, l.faang_plus
+                    FROM listings l
+                    JOIN companies c ON c.id = l.company_id
+                    WHERE l.classifier_version <> %s
+                        AND (%s::uuid IS NULL OR l.id > %s)
+                    ORDER BY l.id
+                    LIMIT %s;
+                    """,
+                    (CLASSIFIER_VERSION, last_id, last_id, batch_size),
+                )
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                ids, categories, faang_plus = [], [], []
+                batch_changed = 0
+                for id, title, company_name, old_category, old_faang_plus in rows:
+                    category = classifyJobCategory({"title": title})
+                    is_faang_plus = classifyFaangPlus({"company_name": company_name})
+                    ids.append(id)
+                    categories.append(category)
+                    faang_plus.append(is_faang_plus)
+                    if (category, is_faang_plus) != (old_category, old_faang_plus):
+                        batch_changed += 1
+
+                # Only listings that changed are synced to clients again
+                version = bump_data_version(cur) if batch_changed else None
+                cur.execute(
+                    """
+                    UPDATE listings l SET
+                        category = v.category,
+                        faang_plus = v.faang_plus,
+                        classifier_version = %s,
+                        version = CASE
+                            WHEN (l.category, l.faang_plus)
+                                IS DISTINCT FROM (v.category, v.faang_plus)
+                            THEN %s
+                            ELSE l.version
+                        END
+                    FROM unnest(%s::uuid[], %s::text[], %s::boolean[])
+                        AS v(id, category, faang_plus)
+                    WHERE l.id = v.id;
+                    """,
+                    (CLASSIFIER_VERSION, version, ids, categories, faang_plus),
+                )
+            conn.commit()
+
+        if version is not None:
+            set_data_version(version)
+        changed += batch_changed
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if changed:
+                refresh_facets_in_db(cur)
+                version = bump_data_version(cur)
+            cur.execute(
+                "UPDATE listings_state SET classifier_version = %s;",
+                (CLASSIFIER_VERSION,),
+            )
+        conn.commit()
+
+    if changed:
+        set_data_version(version)
+    return changed
+
+
+# Counts how current (not archived) listings would be recategorized under proposed rules
+def preview_classifier(rules: ClassifierRules) -> ClassifierPreview:
+    classifier = CategoryClassifier(
+        [(rule.category, rule.keywords) for rule in rules.rules],
+        rules.product_role_words,
+        rules.default_category,
+    )
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT title, category, COUNT(*)
+                FROM listings
+                WHERE NOT archived
+                GROUP BY title, category;
+                """
+            )
+            rows = cur.fetchall()
+
+    current: Counter[str] = Counter()
+    proposed: Counter[str] = Counter()
+    shifts: Counter[tuple[str, str]] = Counter()
+    for title, category, count in rows:
+        new_category = classifier.classify(title.lower())
+        current[category] += count
+        proposed[new_category] += count
+        if new_category != category:
+            shifts[(category, new_category)] += count
+
+    return ClassifierPreview(
+        current=current,
+        proposed=proposed,
+        changed=sum(shifts.values()),
+        shifts=[
+            CategoryShift(from_category=old, to_category=new, count=count)
+            for (old, new), count in shifts.most_common()
+        ],
+    )
+
+
+# Gets the category rules in use
+def get_classifier_rules() -> ClassifierRules:
+    return ClassifierRules(
+        version=CLASSIFIER_VERSION,
+        rules=[
+            CategoryRule(category=category, keywords=keywords)
+            for category, keywords in CATEGORY_RULES
+        ],
+        product_role_words=PRODUCT_ROLE_WORDS,
+        default_category=DEFAULT_CATEGORY,
+    )
+
+
+# Sources of listings, in priority order for listings found in more than one
+def get_listing_sources() -> list[ListingSource]:
     current_year = datetime.now().year
+    return [
+        ListingSource(
+            name="simplify-summer",
+            # This season's repo, or the last one if it isn't up yet
+            urls=[
+                SIMPLIFY_LISTINGS_URL.format(repo=f"Summer{year}-Internships")
+                for year in range(current_year + 1, current_year - 2, -1)
+            ],
+        ),
+        ListingSource(
+            name="simplify-new-grad",
+            urls=[SIMPLIFY_LISTINGS_URL.format(repo="New-Grad-Positions")],
+            defaults={"terms": ["New Grad"]},
+        ),
+    ]
+
+
+# Fetches all sources in parallel, and merges the listings of the feeds that changed
+# Returns the merged listings, the state of each changed feed by source, and how each source went
+def get_listings(
+    sources: list[ListingSource] | None = None,
+) -> tuple[list[ListingRecord], dict[str, FeedState], list[FeedResult]]:
+    if sources is None:
+        sources = get_listing_sources()
+    with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        fetched = list(executor.map(fetch_source, sources))
+    results = [result for _, _, result in fetched]
+    if all(result.status == FeedStatus.FAILED for result in results):
+        raise RuntimeError("Every listing source failed")
+
+    # A listing in several feeds is kept from the first source, so listings stored
+    # from an earlier feed that wasn't read this time also stay with it
+    merged: list[ListingRecord] = []
+    feeds: dict[str, FeedState] = {}
+    ids = set()
+    for i, (listings, feed, result) in enumerate(fetched):
+        if result.status != FeedStatus.CHANGED:
+            if any(r.status == FeedStatus.CHANGED for r in results[i + 1 :]):
+                ids.update(get_feed_listing_ids(result.source))
+            continue
+        feeds[result.source] = feed
+        for listing in listings:
+            if listing.id in ids:
+                result.duplicates += 1
+                continue
+            ids.add(listing.id)
+            merged.append(listing)
+    return merged, feeds, results
+
+
+# Fetches one source, timing it and catching its failure so the other sources still ingest
+def fetch_source(
+    source: ListingSource,
+) -> tuple[list[ListingRecord], FeedState | None, FeedResult]:
+    start = time.perf_counter()
+    result = FeedResult(source=source.name, status=FeedStatus.FAILED)
+    listings: list[ListingRecord] = []
+    feed = None
+    try:
+        feed, fetched = fetch_feed(source, result)
+        if fetched is None:
+            result.status = FeedStatus.UNCHANGED
+        else:
+            listings = fetched
+            result.status = FeedStatus.CHANGED
+            result.listings = len(listings)
+    except Exception as e:
+        result.error = repr(e)
+    result.seconds = round(time.perf_counter() - start, 3)
+
+    detail = result.error if result.error else f"{result.listings} listings"
+    print(f"{source.name}: {result.status.value} in {result.seconds:.2f}s ({detail})")
+    return listings, feed, result
+
+
+# Downloads the first of a source's URLs that exists, noting the URL and parse time in result
+# Returns its listings, or None if the feed is unchanged since the last successful ingest
+def fetch_feed(
+    source: ListingSource, result: FeedResult
+) -> tuple[FeedState, list[ListingRecord] | None]:
+    for url in source.urls:
+        result.url = url
+        previous = get_feed_state(url)
+        request_headers = headers
+        if previous is not None and previous.etag is not None:
+            request_headers = {**headers, "If-None-Match": previous.etag}
+
+        with requests.get(
+            url, headers=request_headers, stream=True, timeout=FEED_TIMEOUT
+        ) as r:
+            if r.status_code == 304:
+                return previous, None
+            # Only a missing repo falls through to the next URL
+            if r.status_code == 404:
+                continue
+            r.raise_for_status()
+            etag = r.headers.get("ETag")
+            file, content_hash = download_feed(r)
+
+        with file:
+            feed = FeedState(url=url, etag=etag, content_hash=content_hash)
+            if previous is not None and previous.content_hash == feed.content_hash:
+                if feed.etag != previous.etag:
+                    save_feed_state(feed)
+                return feed, None
+
+            start = time.perf_counter()
+            listings, result.rekeyed = parse_listings(file, source)
+            result.parse_seconds = round(time.perf_counter() - start, 3)
+            # Most likely a bad upstream commit: don't delete the feed's listings over it
+            if not listings:
+                raise ValueError(f"{source.name} has no listings")
+            return feed, listings
+    raise LookupError(f"No listings found for {source.name}")
+
+
+# Gets the IDs of current listings from a feed
+def get_feed_listing_ids(feed: str) -> list:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT id FROM listings WHERE feed = %s AND NOT archived;", (feed,)
+            )
+            return [row[0] for row in cur.fetchall()]
+
+
+# Downloads a response body to a temporary file, hashing it along the way
+def download_feed(r: requests.Response) -> tuple[IO[bytes], str]:
+    file = tempfile.TemporaryFile()
+    digest = hashlib.sha256()
+    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+        digest.update(chunk)
+        file.write(chunk)
+    file.seek(0)
+    return file, digest.hexdigest()
+
+
+# Parses a downloaded feed of source one listing at a time
+# Returns the listings and how many of them were given a derived ID (see ensure_unique_ids)
+def parse_listings(
+    file: IO[bytes],
+    source: ListingSource,
+    stored: dict[UUID, tuple[str, str]] | None = None,
+) -> tuple[list[ListingRecord], int]:
+    text = io.TextIOWrapper(file, encoding="utf-8")
+    raw_listings = iter_json_array(text)
+    return ensure_unique_ids(
+        (
+            ListingRecord.from_json(source.map_listing(raw), source.name)
+            for raw in raw_listings
+        ),
+        stored,
+    )
+
+
+# Yields the items of a top-level JSON array without decoding the whole document
+def iter_json_array(file: IO[str]) -> Iterator:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while not buffer.strip():
+        chunk = file.read(CHUNK_SIZE)
+        if not chunk:
+            raise ValueError("Expected a JSON array")
+        buffer += chunk
+    buffer = buffer.lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+
+    while True:
+        pos = ARRAY_SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+
+        # Decode the next item, reading more if it runs past the buffer; an item is
+        # only complete once a separator follows, as a number cut short by the end
+        # of a chunk (1. of 1.5) still decodes
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) and buffer[end] in ITEM_TERMINATORS
+        except json.JSONDecodeError:
+            complete = False
+        if not complete:
+            chunk = file.read(CHUNK_SIZE)
+            if chunk:
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            if pos == len(buffer):
+                raise ValueError("Unexpected end of JSON array")
+            item, end = decoder.raw_decode(buffer, pos)
 
-    for year in range(current_year + 1, current_year - 2, -1):
-        ENDPOINT = f"https://api.github.com/repos/SimplifyJobs/Summer{year}-Internships/contents/.github/scripts/listings.json"
+        yield item
+        pos = end
+        # Drop what has been decoded so the buffer stays around one chunk
+        if pos >= CHUNK_SIZE:
+            buffer = buffer[pos:]
+            pos = 0
 
-        r = requests.get(ENDPOINT, headers=headers)
-        if r.ok:
-            raw_listings = r.json()
-            listings = [Listing.from_json(listing) for listing in raw_listings]
-            listings = ensure_unique_ids(listings)
-            return listings
-    assert False, "No listings found"
 
+# Gets the feed state stored by the last successful ingest
+def get_feed_state(url: str) -> FeedState | None:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT url, etag, content_hash FROM ingest_sources WHERE url = %s;",
+                (url,),
+            )
+            row = cur.fetchone()
+            if row:
+                return FeedState(url=row[0], etag=row[1], content_hash=row[2])
+    return None
 
-# Ensures each listing has a unique ID
-def ensure_unique_ids(listings: list[Listing]):
-    unique_ids = set()
-    unique_listings: list[Listing] = []
+
+# Stores the feed state once its listings are ingested
+def save_feed_state(feed: FeedState):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO ingest_sources (url, etag, content_hash, fetched_at)
+                VALUES (%s, %s, %s, NOW())
+                ON CONFLICT (url) DO UPDATE SET
+                    etag = EXCLUDED.etag,
+                    content_hash = EXCLUDED.content_hash,
+                    fetched_at = EXCLUDED.fetched_at;
+                """,
+                (feed.url, feed.etag, feed.content_hash),
+            )
+        conn.commit()
+
+
+# Ensures each listing has a unique ID, deriving one for listings whose upstream ID is taken
+# A listing keeps the ID it's stored under, whether upstream or derived, as others
+# come to share its upstream ID or stop sharing it; stored maps the stored IDs among
+# the candidates to their rows' source and URL, and is read from the DB if not given
+# Returns the listings and how many of them were given a derived ID
+def ensure_unique_ids(
+    listings: Iterable[ListingRecord],
+    stored: dict[UUID, tuple[str, str]] | None = None,
+) -> tuple[list[ListingRecord], int]:
+    listings = list(listings)
+    groups: dict[UUID, list[ListingRecord]] = defaultdict(list)
     for listing in listings:
-        if listing.id in unique_ids:
-            listing.id = uuid4()
-        unique_ids.add(listing.id)
-        unique_listings.append(listing)
-    return unique_listings
+        groups[listing.id].append(listing)
+    candidates = {
+        upstream_id: derive_listing_ids(upstream_id, group)
+        for upstream_id, group in groups.items()
+    }
+    if stored is None:
+        stored = get_stored_listing_keys(
+            [*candidates, *(id for ids in candidates.values() for id in ids)]
+        )
+
+    derived = 0
+    for upstream_id, group in groups.items():
+        ids = candidates[upstream_id]
+        keeper = find_upstream_keeper(upstream_id, group, ids, stored)
+        for i, listing in enumerate(group):
+            if i != keeper:
+                listing.id = ids[i]
+                derived += 1
+    return listings, derived
+
+
+# Which listing of a group sharing an upstream ID keeps it, if any: none that is
+# stored under its derived ID, then the one stored under the upstream ID (matched
+# by source and URL), then the first in canonical order, whatever the feed order
+def find_upstream_keeper(
+    upstream_id: UUID,
+    group: list[ListingRecord],
+    ids: list[UUID],
+    stored: dict[UUID, tuple[str, str]],
+) -> int | None:
+    candidates = [i for i in canonical_order(group) if ids[i] not in stored]
+    if not candidates:
+        return None
+    if upstream_id in stored:
+        for i in candidates:
+            if (group[i].source, group[i].url) == stored[upstream_id]:
+                return i
+    return candidates[0]
+
+
+# Indexes of listings sharing an upstream ID, by source, company, URL, title and locations
+def canonical_order(group: list[ListingRecord]) -> list[int]:
+    return sorted(
+        range(len(group)),
+        key=lambda i: (listing_name(group[i]), group[i].title, group[i].locations),
+    )
+
 
+def listing_name(listing: ListingRecord) -> str:
+    return f"{listing.source}|{listing.company_name}|{listing.url}"
 
-# Assigns companies to listings
-def assign_companies(listings: list[Listing]):
-    existing_companies = get_companies_from_db()
-    existing_map = {c.name.strip().lower(): c for c in existing_companies}
 
-    # Scrape new logos
-    new_companies: list[Company] = []
+# Name-based IDs for listings that share an upstream ID, the same on every ingest
+# whatever order the feed lists them in: each comes from the upstream ID, source,
+# company and URL, and listings that share all of those are numbered in canonical order
+def derive_listing_ids(upstream_id: UUID, group: list[ListingRecord]) -> list[UUID]:
+    ids: dict[int, UUID] = {}
+    ordinals: Counter[str] = Counter()
+    for i in canonical_order(group):
+        name = listing_name(group[i])
+        ordinals[name] += 1
+        ordinal = ordinals[name]
+        ids[i] = uuid5(upstream_id, name if ordinal == 1 else f"{name}|{ordinal}")
+    return [ids[i] for i in range(len(group))]
+
+
+# Gets the source and URL of the listings stored under any of ids, current ones first
+def get_stored_listing_keys(ids: list[UUID]) -> dict[UUID, tuple[str, str]]:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT DISTINCT ON (id) id, source, url
+                FROM listings
+                WHERE id = ANY(%s)
+                ORDER BY id, archived;
+                """,
+                (ids,),
+            )
+            return {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+
+# Finds the companies of listings that aren't in DB yet
+def find_new_companies(listings: list[ListingRecord]) -> list[Company]:
+    existing = {c.name.strip().lower() for c in get_companies_from_db()}
+    new_companies: dict[str, Company] = {}
     for listing in listings:
-        key = listing.company.name.strip().lower()
-        if key not in existing_map:
-            scrape_company_logo(listing.company)
-            new_companies.append(listing.company)
-            existing_map[key] = listing.company
+        key = listing.company_name.strip().lower()
+        if key not in existing and key not in new_companies:
+            new_companies[key] = Company(
+                name=listing.company_name, url=listing.company_url
+            )
+    return list(new_companies.values())
+
+
+# Inserts new companies along with their logo scrape attempts, and assigns companies to listings
+def assign_companies(
+    listings: list[ListingRecord],
+    new_companies: list[Company],
+    attempts: list[LogoAttempt | None],
+):
     if new_companies:
         ids = insert_companies(new_companies)
-        for company, id in zip(new_companies, ids):
-            company.id = id
-            key = company.name.strip().lower()
-            existing_map[key] = company
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                save_logo_attempts(cur, list(zip(ids, attempts)))
 
     # Assign companies
+    ids_by_name = {c.name.strip().lower(): c.id for c in get_companies_from_db()}
     for listing in listings:
-        key = listing.company.name.strip().lower()
-        listing.company = existing_map[key]
+        listing.company_id = ids_by_name[listing.company_name.strip().lower()]
+
+
+# Spaces out requests to the same host
+class HostThrottle:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = Lock()
+        self.next_at: dict[str, float] = {}
+
+    # Blocks until a request to url's host is allowed
+    def wait(self, url: str):
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at.get(host, now))
+            self.next_at[host] = at + self.interval
+        time.sleep(at - now)
+
+
+# Shared keep-alive client for logo scraping, retrying transient failures
+scrape_session = requests.Session()
+scrape_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_maxsize=SCRAPE_WORKERS,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+        ),
+    ),
+)
+scrape_throttle = HostThrottle(SCRAPE_HOST_INTERVAL)
+
+
+# Scrapes logos for many companies concurrently
+# previous_hashes holds the page hash of each company's last attempt, if any
+def scrape_company_logos(
+    companies: list[Company], previous_hashes: list[str | None] | None = None
+) -> list[LogoAttempt | None]:
+    if previous_hashes is None:
+        previous_hashes = [None] * len(companies)
+    with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as executor:
+        return list(executor.map(scrape_company_logo, companies, previous_hashes))
 
 
 # Scrapes company logo from Simplify website
-def scrape_company_logo(company: Company) -> str | None:
+# Returns None for companies that aren't on Simplify
+def scrape_company_logo(
+    company: Company, previous_hash: str | None = None
+) -> LogoAttempt | None:
     # Only scrape companies on Simplify
-    if not company.url.startswith("https://simplify.jobs/c/"):
+    if not company.url.startswith(SIMPLIFY_COMPANY_URL):
         return None
 
-    soup = BeautifulSoup(requests.get(company.url).text, "html.parser")
-    img = soup.find(name="img", attrs={"alt": company.name})
-    if img:
-        company.logo_url = str(img["src"])
+    scrape_throttle.wait(company.url)
+    try:
+        r = scrape_session.get(company.url, timeout=SCRAPE_TIMEOUT)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Failed to scrape logo for {company.name}: {e}")
+        return LogoAttempt(status=LogoStatus.FAILED)
+
+    # Same page as last time, which had no logo
+    content_hash = hashlib.sha256(r.content).hexdigest()
+    if content_hash == previous_hash:
+        return LogoAttempt(status=LogoStatus.MISSING, content_hash=content_hash)
+
+    # Only build the tree for the logo itself
+    soup = BeautifulSoup(
+        r.text,
+        "html.parser",
+        parse_only=SoupStrainer(name="img", attrs={"alt": company.name}),
+    )
+    img = soup.find(name="img")
+    if not img:
+        return LogoAttempt(status=LogoStatus.MISSING, content_hash=content_hash)
+    company.logo_url = str(img["src"])
+    return LogoAttempt(status=LogoStatus.FOUND, content_hash=content_hash)
+
+
+# Records logo scrape attempts, scheduling the next retry of unresolved ones
+def save_logo_attempts(
+    cur: psycopg.Cursor, attempts: list[tuple[int, LogoAttempt | None]]
+):
+    params = [
+        {
+            "company_id": company_id,
+            "status": attempt.status.value,
+            "content_hash": attempt.content_hash,
+            "backoff": LOGO_RETRY_BACKOFF.get(attempt.status),
+            "max_backoff": LOGO_RETRY_MAX_BACKOFF,
+        }
+        for company_id, attempt in attempts
+        if attempt is not None
+    ]
+    if not params:
+        return
+
+    # Retries back off exponentially with the number of attempts, up to max_backoff
+    cur.executemany(
+        """
+        INSERT INTO company_logo_attempts (company_id, status, next_retry, content_hash)
+        VALUES (
+            %(company_id)s, %(status)s, NOW() + %(backoff)s::interval, %(content_hash)s
+        )
+        ON CONFLICT (company_id) DO UPDATE SET
+            status = EXCLUDED.status,
+            attempts = company_logo_attempts.attempts + 1,
+            last_attempt = EXCLUDED.last_attempt,
+            next_retry = CASE WHEN %(backoff)s::interval IS NOT NULL THEN
+                NOW() + LEAST(
+                    %(backoff)s::interval * power(2, company_logo_attempts.attempts),
+                    %(max_backoff)s::interval
+                )
+            END,
+            content_hash = COALESCE(
+                EXCLUDED.content_hash, company_logo_attempts.content_hash
+            );
+        """,
+        params,
+    )
+
+
+# Retries scraping logos that are still missing and due, up to budget companies
+# Returns the number of logos found
+def retry_company_logos(budget: int = LOGO_RETRY_BUDGET) -> int:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # Companies never attempted come first
+            cur.execute(
+                """
+                SELECT c.id, c.name, c.url, a.content_hash
+                FROM companies c
+                LEFT JOIN company_logo_attempts a ON a.company_id = c.id
+                WHERE c.logo_url IS NULL
+                    AND c.url LIKE %s
+                    AND (a.company_id IS NULL OR a.next_retry <= NOW())
+                ORDER BY a.next_retry NULLS FIRST
+                LIMIT %s;
+                """,
+                (SIMPLIFY_COMPANY_URL + "%", budget),
+            )
+            rows = cur.fetchall()
+    if not rows:
+        return 0
+
+    companies = [Company(id=row[0], name=row[1], url=row[2]) for row in rows]
+    attempts = scrape_company_logos(companies, [row[3] for row in rows])
+    found = [c for c in companies if c.logo_url is not None]
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            save_logo_attempts(cur, [(c.id, a) for c, a in zip(companies, attempts)])
+            if not found:
+                return 0
+
+            cur.executemany(
+                "UPDATE companies SET logo_url = %s WHERE id = %s;",
+                [(c.logo_url, c.id) for c in found],
+            )
+            # Listings of these companies show the new logo, so sync them again
+            version = bump_data_version(cur)
+            cur.execute(
+                "UPDATE listings SET version = %s WHERE company_id = ANY(%s);",
+                (version, [c.id for c in found]),
+            )
+        conn.commit()
+
+    set_data_version(version)
+    return len(found)
 
 
 # Inserts companies into DB
@@ -393,56 +1084,288 @@ def insert_companies(companies: list[Company]):
             return [id_map[c.name.strip().lower()] for c in companies]
 
 
-# Inserts listings into DB
-def insert_listings(listings: list[Listing]):
-    if not listings:
-        return
-
-    listing_tuples = [l.to_tuple() for l in listings]
-    new_ids = [(l.id,) for l in listings]
+# Inserts new and changed listings into DB, and archives listings no longer in their feed
+# Only stored listings of the given feeds are archived, so an unchanged or failed feed keeps its own
+def insert_listings(
+    listings: list[ListingRecord],
+    feeds: list[str],
+    strategy: IngestStrategy = INGEST_STRATEGY,
+) -> IngestSummary:
+    if not feeds:
+        return IngestSummary()
 
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            # Upsert listings
-            cur.executemany(
-                """
-                INSERT INTO listings (
-                    id, source, title, active, date_updated, is_visible,
-                    date_posted, url, locations, terms, sponsorship,
-                    category, faang_plus, company_id
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s
-                )
-                ON CONFLICT (id) DO UPDATE SET
-                    source = EXCLUDED.source,
-                    title = EXCLUDED.title,
-                    active = EXCLUDED.active,
-                    date_updated = EXCLUDED.date_updated,
-                    is_visible = EXCLUDED.is_visible,
-                    date_posted = EXCLUDED.date_posted,
-                    url = EXCLUDED.url,
-                    locations = EXCLUDED.locations,
-                    terms = EXCLUDED.terms,
-                    sponsorship = EXCLUDED.sponsorship,
-                    category = EXCLUDED.category,
-                    faang_plus = EXCLUDED.faang_plus,
-                    company_id = EXCLUDED.company_id;
-                """,
-                listing_tuples,
+            # New version, recorded on every row this ingest writes, archives or restores
+            version = bump_data_version(cur)
+
+            match strategy:
+                case IngestStrategy.COPY:
+                    summary = write_listings_copy(cur, listings, feeds, version)
+                case IngestStrategy.EXECUTEMANY:
+                    summary = write_listings_executemany(cur, listings, feeds, version)
+
+            # Nothing changed: keep the current version so caches stay valid
+            if (
+                summary.unchanged == len(listings)
+                and not summary.archived
+                and not summary.restored
+            ):
+                conn.rollback()
+                return summary
+
+            refresh_facets_in_db(cur)
+
+        conn.commit()
+
+    set_data_version(version)
+    return summary
+
+
+# Columns of listings written by ingest, in ListingRecord.to_tuple order plus the hash
+INGEST_COLUMNS = """
+    id, source, title, active, date_updated, is_visible,
+    date_posted, url, locations, terms, sponsorship,
+    category, faang_plus, company_id, classifier_version, feed, content_hash
+"""
+
+# Overwrites a conflicting listing only if its content hash differs
+# Upserts go straight to the current partition, where xmax tells inserts from updates
+UPSERT_CONFLICT = """
+    ON CONFLICT (id, archived) DO UPDATE SET
+        source = EXCLUDED.source,
+        title = EXCLUDED.title,
+        active = EXCLUDED.active,
+        date_updated = EXCLUDED.date_updated,
+        is_visible = EXCLUDED.is_visible,
+        date_posted = EXCLUDED.date_posted,
+        url = EXCLUDED.url,
+        locations = EXCLUDED.locations,
+        terms = EXCLUDED.terms,
+        sponsorship = EXCLUDED.sponsorship,
+        category = EXCLUDED.category,
+        faang_plus = EXCLUDED.faang_plus,
+        company_id = EXCLUDED.company_id,
+        classifier_version = EXCLUDED.classifier_version,
+        feed = EXCLUDED.feed,
+        content_hash = EXCLUDED.content_hash,
+        version = EXCLUDED.version
+    WHERE listings_current.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+"""
+
+
+# Bulk loads listings into a staging table with COPY, then restores, upserts and archives set-wise
+def write_listings_copy(
+    cur: psycopg.Cursor, listings: list[ListingRecord], feeds: list[str], version: int
+) -> IngestSummary:
+    summary = IngestSummary()
+
+    # Temp tables are never WAL-logged and are private to this session
+    cur.execute(
+        f"""
+        CREATE TEMP TABLE tmp_listings ON COMMIT DROP AS
+        SELECT {INGEST_COLUMNS} FROM listings WITH NO DATA;
+        """
+    )
+    with cur.copy(f"COPY tmp_listings ({INGEST_COLUMNS}) FROM STDIN") as copy:
+        for l in listings:
+            copy.write_row(l.to_tuple() + (l.content_hash(),))
+    cur.execute("ANALYZE tmp_listings;")
+
+    # Move listings back in a feed out of the archive, so the upsert finds them
+    cur.execute(
+        """
+        UPDATE listings l SET archived = FALSE, version = %s
+        WHERE l.archived AND EXISTS (SELECT 1 FROM tmp_listings t WHERE t.id = l.id);
+        """,
+        (version,),
+    )
+    summary.restored = cur.rowcount
+
+    # Upsert listings, leaving rows whose content hash matches untouched
+    cur.execute(
+        f"""
+        WITH upserted AS (
+            INSERT INTO listings_current ({INGEST_COLUMNS}, version)
+            SELECT {INGEST_COLUMNS}, %s FROM tmp_listings
+            {UPSERT_CONFLICT}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE inserted),
+            COUNT(*) FILTER (WHERE NOT inserted)
+        FROM upserted;
+        """,
+        (version,),
+    )
+    summary.inserted, summary.updated = cur.fetchone()
+    summary.unchanged = len(listings) - summary.inserted - summary.updated
+
+    # Archive old listings
+    cur.execute(
+        """
+        WITH archived AS (
+            UPDATE listings l SET archived = TRUE, version = %s
+            WHERE NOT l.archived
+                AND l.feed = ANY(%s)
+                AND NOT EXISTS (SELECT 1 FROM tmp_listings t WHERE t.id = l.id)
+            RETURNING l.id
+        )
+        INSERT INTO listing_tombstones (id, version)
+        SELECT id, %s FROM archived
+        ON CONFLICT (id) DO UPDATE
+            SET version = EXCLUDED.version, removed_at = EXCLUDED.removed_at;
+        """,
+        (version, feeds, version),
+    )
+    summary.archived = cur.rowcount
+    return summary
+
+
+# Upserts listings one statement at a time, restoring and archiving by ID list
+def write_listings_executemany(
+    cur: psycopg.Cursor, listings: list[ListingRecord], feeds: list[str], version: int
+) -> IngestSummary:
+    summary = IngestSummary()
+
+    cur.execute("CREATE TEMP TABLE tmp_listing_ids(id UUID) ON COMMIT DROP;")
+    # An empty feed still archives everything it had, as with COPY
+    if listings:
+        cur.executemany(
+            "INSERT INTO tmp_listing_ids(id) VALUES (%s);",
+            ((l.id,) for l in listings),
+        )
+
+        # Move listings back in a feed out of the archive, so the upsert finds them
+        cur.execute(
+            """
+            UPDATE listings SET archived = FALSE, version = %s
+            WHERE archived AND id IN (SELECT id FROM tmp_listing_ids);
+            """,
+            (version,),
+        )
+        summary.restored = cur.rowcount
+
+        # Upsert listings, leaving rows whose content hash matches untouched
+        cur.executemany(
+            f"""
+            INSERT INTO listings_current ({INGEST_COLUMNS}, version)
+            VALUES (
+                %s, %s, %s, %s, %s, %s,
+                %s, %s, %s, %s, %s,
+                %s, %s, %s, %s, %s, %s, %s
             )
+            {UPSERT_CONFLICT}
+            RETURNING (xmax = 0) AS inserted;
+            """,
+            (l.to_tuple() + (l.content_hash(), version) for l in listings),
+            returning=True,
+        )
+        # One result per listing, empty when it was unchanged
+        while True:
+            row = cur.fetchone()
+            if row is None:
+                summary.unchanged += 1
+            elif row[0]:
+                summary.inserted += 1
+            else:
+                summary.updated += 1
+            if not cur.nextset():
+                break
 
-            # Delete old listings
-            cur.execute("CREATE TEMP TABLE tmp_listing_ids(id UUID) ON COMMIT DROP;")
+    # Archive old listings
+    cur.execute(
+        """
+        WITH archived AS (
+            UPDATE listings SET archived = TRUE, version = %s
+            WHERE NOT archived
+                AND feed = ANY(%s)
+                AND id NOT IN (SELECT id FROM tmp_listing_ids)
+            RETURNING id
+        )
+        INSERT INTO listing_tombstones (id, version)
+        SELECT id, %s FROM archived
+        ON CONFLICT (id) DO UPDATE
+            SET version = EXCLUDED.version, removed_at = EXCLUDED.removed_at;
+        """,
+        (version, feeds, version),
+    )
+    summary.archived = cur.rowcount
+    return summary
 
-            cur.executemany("INSERT INTO tmp_listing_ids(id) VALUES (%s);", new_ids)
 
-            cur.execute(
-                """
-                DELETE FROM listings
-                WHERE id NOT IN (SELECT id FROM tmp_listing_ids);
-                """
+# Runs a whole ingest as cron run run_id, unless another ingest holds the lock
+# Each stage's time, memory and rows in and out are recorded with the run
+def run_ingest(run_id: int):
+    result = CronResult()
+    try:
+        with ingest_lock() as acquired, trace_memory():
+            if not acquired:
+                finish_run(
+                    run_id, CronRunStatus.SKIPPED, error="Another ingest is running"
+                )
+                return
+
+            start_run(run_id)
+            run_stages(run_id, result)
+    except Exception as e:
+        # including failures to take the lock or start the run, which would
+        # otherwise leave it queued
+        traceback.print_exc()
+        finish_run(run_id, CronRunStatus.FAILED, result=result, error=repr(e))
+        return
+
+    finish_run(run_id, CronRunStatus.SUCCEEDED, result=result)
+
+
+def run_stages(run_id: int, result: CronResult):
+    """runs each stage of an ingest, recording what it did in result"""
+    # Reclassify stored listings if the category rules changed
+    with run_stage(run_id, CronStage.RECLASSIFYING) as stage:
+        result.reclassified = stage.rows_out = reclassify_listings()
+
+    # Get listings of the feeds that changed since the last ingest
+    with run_stage(run_id, CronStage.FETCHING) as stage:
+        listings, feeds, result.feeds = get_listings()
+        stage.rows_in = sum(feed.listings for feed in result.feeds)
+        stage.rows_out = len(listings)
+
+    if feeds:
+        # Classify listings with titles not classified before
+        with run_stage(run_id, CronStage.CLASSIFYING) as stage:
+            stage.rows_in = len(listings)
+            result.classified = stage.rows_out = classify_listings(listings)
+        # Scrape logos of companies new to the DB
+        with run_stage(run_id, CronStage.SCRAPING_LOGOS) as stage:
+            new_companies = find_new_companies(listings)
+            attempts = scrape_company_logos(new_companies)
+            stage.rows_in = len(new_companies)
+            stage.rows_out = sum(c.logo_url is not None for c in new_companies)
+        # Insert new companies and assign them to listings
+        with run_stage(run_id, CronStage.ASSIGNING_COMPANIES) as stage:
+            stage.rows_in = len(new_companies)
+            assign_companies(listings, new_companies, attempts)
+            stage.rows_out = len(listings)
+        # Insert new and changed listings into DB
+        with run_stage(run_id, CronStage.WRITING_LISTINGS) as stage:
+            stage.rows_in = len(listings)
+            result.listings = insert_listings(listings, list(feeds))
+            stage.rows_out = (
+                result.listings.inserted
+                + result.listings.updated
+                + result.listings.archived
             )
+            # Remember the feeds so unchanged ones are skipped next time
+            for feed in feeds.values():
+                save_feed_state(feed)
+        # Warm the listings snapshot for the new version
+        with run_stage(run_id, CronStage.WARMING_SNAPSHOT) as stage:
+            stage.rows_out = len(listings_snapshot.get())
 
-        conn.commit()
+    # Retry missing logos once the listings are in
+    with run_stage(run_id, CronStage.RETRYING_LOGOS) as stage:
+        result.logos_found = stage.rows_out = retry_company_logos()
+
+    # Forget removals older than the delta sync retention window
+    with run_stage(run_id, CronStage.PRUNING_TOMBSTONES) as stage:
+        result.tombstones_pruned = stage.rows_out = prune_tombstones_in_db()
@@ -9,8 +9,8 @@ def save_favorite_to_db(user_id: int, listing_id: UUID) -> bool:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                INSERT INTO favorites (user_id, listing_id)
-                VALUES (%s, %s)
+                INSERT INTO favorites (user_id, listing_id, listing_archived)
+                SELECT %s, id, archived FROM listings WHERE id = %s
                 ON CONFLICT (user_id, listing_id) DO NOTHING
                 RETURNING user_id;
                 """,
@@ -29,9 +29,10 @@ def get_favorites_from_db(user_id: int) -> list[Listing]:
                 """
                 SELECT
                     l.id, l.source, l.title, l.active, l.date_updated, l.is_visible, l.date_posted, l.url, l.locations, l.terms, l.sponsorship, l.category, l.faang_plus,
-                    c.id AS company_id, c.name, c.url, c.logo_url
+                    c.id AS company_id, c.name, c.url, c.logo_url, l.archived
                 FROM listings l
-                JOIN favorites f ON l.id = f.listing_id
+                JOIN favorites f
+                    ON l.id = f.listing_id AND l.archived = f.listing_archived
                 LEFT JOIN companies c ON l.company_id = c.id
                 WHERE f.user_id = %s;
                 """,
@@ -0,0 +1,313 @@
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from statistics import median
+from threading import Lock
+from typing import Callable
+
+from ..models.cron import (
+    CronResult,
+    CronRun,
+    CronRunReport,
+    CronRunStatus,
+    CronStage,
+    CronStageReport,
+    CronStageStats,
+)
+from .db import get_db_connection
+
+# ingest runs in this worker thread, off the event loop
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cron")
+# id and future of the run this worker last submitted to the executor
+submitted: tuple[int, Future] | None = None
+submit_lock = Lock()
+
+# pg_advisory_lock key held for the duration of an ingest, across all workers
+INGEST_LOCK_KEY = 0x0BC1
+
+# trace Python allocations during ingest for each stage's peak memory (parsing runs ~4x slower)
+TRACE_MEMORY = os.getenv("CRON_TRACE_MEMORY") == "1"
+
+# a stage's baseline is its median over this many earlier successful runs (and at least
+# BASELINE_MIN_RUNS); it regressed if a metric is REGRESSION_FACTOR times the baseline
+# and at least the metric's minimum increase above it, so noise on short stages doesn't count
+BASELINE_RUNS = 10
+BASELINE_MIN_RUNS = 3
+REGRESSION_FACTOR = 1.5
+REGRESSION_MIN_INCREASE = {
+    "wall_seconds": 1.0,
+    "cpu_seconds": 1.0,
+    "peak_memory": 16 << 20,
+}
+
+CRON_RUN_COLUMNS = """
+    id, status, stage, created_at, started_at, finished_at, result, error
+"""
+
+CRON_STAGE_COLUMNS = """
+    stage, wall_seconds, cpu_seconds, peak_memory, max_rss, rows_in, rows_out
+"""
+
+
+@contextmanager
+def ingest_lock():
+    """
+    tries to take the ingest lock, yielding whether it was taken
+
+    The lock belongs to the database session, so it is released even if this
+    worker dies mid-ingest.
+    """
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT pg_try_advisory_lock(%s);", (INGEST_LOCK_KEY,)
+        ).fetchone()
+        # don't sit idle in a transaction while the ingest runs
+        conn.commit()
+        acquired = row is not None and row[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute("SELECT pg_advisory_unlock(%s);", (INGEST_LOCK_KEY,))
+                conn.commit()
+
+
+def create_run() -> CronRun:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"INSERT INTO cron_runs DEFAULT VALUES RETURNING {CRON_RUN_COLUMNS};"
+            )
+            return CronRun.from_tuple(cur.fetchone())
+
+
+def submit_run(ingest: Callable[[int], None]) -> tuple[CronRun, Future]:
+    """
+    creates a run and submits ingest of it to the executor, or returns the run this
+    worker already has queued or running, along with its future
+    """
+    global submitted
+    with submit_lock:
+        if submitted is not None and not submitted[1].done():
+            run = get_run(submitted[0])
+            if run is not None:
+                return run, submitted[1]
+
+        run = create_run()
+        future = executor.submit(ingest, run.id)
+        submitted = (run.id, future)
+        return run, future
+
+
+def get_run(run_id: int) -> CronRun | None:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {CRON_RUN_COLUMNS} FROM cron_runs WHERE id = %s;", (run_id,)
+            )
+            row = cur.fetchone()
+            return CronRun.from_tuple(row) if row else None
+
+
+def start_run(run_id: int):
+    """marks a run as running; call while holding the ingest lock"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # nothing else can be running, so these were cut off mid-ingest
+            cur.execute(
+                """
+                UPDATE cron_runs
+                SET status = 'failed', finished_at = NOW(), error = 'Interrupted'
+                WHERE status = 'running';
+                """
+            )
+            cur.execute(
+                """
+                UPDATE cron_runs
+                SET status = 'running', started_at = NOW()
+                WHERE id = %s;
+                """,
+                (run_id,),
+            )
+
+
+def set_run_stage(run_id: int, stage: CronStage):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE cron_runs SET stage = %s WHERE id = %s;",
+                (stage.value, run_id),
+            )
+
+
+def finish_run(
+    run_id: int,
+    status: CronRunStatus,
+    result: CronResult | None = None,
+    error: str | None = None,
+):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE cron_runs
+                SET status = %s, finished_at = NOW(), result = %s::jsonb, error = %s
+                WHERE id = %s;
+                """,
+                (
+                    status.value,
+                    result.model_dump_json() if result is not None else None,
+                    error,
+                    run_id,
+                ),
+            )
+
+
+@contextmanager
+def trace_memory():
+    """traces Python allocations for the duration, if CRON_TRACE_MEMORY is set"""
+    started = TRACE_MEMORY and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def get_max_rss() -> int:
+    """high-water resident set size of this process, in bytes"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in kilobytes, except on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@contextmanager
+def run_stage(run_id: int, stage: CronStage):
+    """
+    marks a run as being at stage, yielding its stats for the caller to set rows_in
+    and rows_out; time and memory are measured and stored when the stage ends,
+    even if it fails
+    """
+    set_run_stage(run_id, stage)
+    stats = CronStageStats(stage=stage)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield stats
+    finally:
+        stats.wall_seconds = round(time.perf_counter() - wall, 3)
+        stats.cpu_seconds = round(time.process_time() - cpu, 3)
+        if tracing:
+            stats.peak_memory = tracemalloc.get_traced_memory()[1]
+        stats.max_rss = get_max_rss()
+        save_stage_stats(run_id, stats)
+
+
+def save_stage_stats(run_id: int, stats: CronStageStats):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO cron_run_stages (run_id, {CRON_STAGE_COLUMNS})
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+                """,
+                (
+                    run_id,
+                    stats.stage.value,
+                    stats.wall_seconds,
+                    stats.cpu_seconds,
+                    stats.peak_memory,
+                    stats.max_rss,
+                    stats.rows_in,
+                    stats.rows_out,
+                ),
+            )
+
+
+def get_run_reports(limit: int) -> list[CronRunReport]:
+    """
+    gets the latest runs, newest first, with each stage compared to its baseline
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {CRON_RUN_COLUMNS} FROM cron_runs ORDER BY id DESC LIMIT %s;",
+                (limit,),
+            )
+            runs = [CronRun.from_tuple(row) for row in cur.fetchall()]
+            if not runs:
+                return []
+
+            # Stages of these runs, and of enough successful runs before each for a baseline
+            cur.execute(
+                f"""
+                SELECT r.id, r.status = 'succeeded', s.*
+                FROM cron_runs r
+                CROSS JOIN LATERAL (
+                    SELECT {CRON_STAGE_COLUMNS} FROM cron_run_stages WHERE run_id = r.id
+                ) s
+                WHERE r.id = ANY(%s) OR r.id IN (
+                    SELECT id FROM cron_runs
+                    WHERE status = 'succeeded' AND id <= %s
+                    ORDER BY id DESC
+                    LIMIT %s
+                );
+                """,
+                ([run.id for run in runs], runs[0].id, limit + BASELINE_RUNS),
+            )
+            rows = cur.fetchall()
+
+    stages: dict[int, list[CronStageStats]] = defaultdict(list)
+    succeeded: set[int] = set()
+    for row in rows:
+        stages[row[0]].append(CronStageStats.from_tuple(row[2:]))
+        if row[1]:
+            succeeded.add(row[0])
+    order = list(CronStage)
+
+    reports: list[CronRunReport] = []
+    for run in runs:
+        earlier = sorted(run_id for run_id in succeeded if run_id < run.id)
+        history = [stages[run_id] for run_id in earlier[-BASELINE_RUNS:]]
+        run_stages = sorted(stages.get(run.id, []), key=lambda s: order.index(s.stage))
+        report = CronRunReport(
+            **run.model_dump(),
+            stages=[compare_to_baseline(stats, history) for stats in run_stages],
+        )
+        report.regressed = any(stage.regressions for stage in report.stages)
+        reports.append(report)
+    return reports
+
+
+def compare_to_baseline(
+    stats: CronStageStats, history: list[list[CronStageStats]]
+) -> CronStageReport:
+    report = CronStageReport(**stats.model_dump())
+    for metric, min_increase in REGRESSION_MIN_INCREASE.items():
+        values = [
+            getattr(earlier, metric)
+            for run_stages in history
+            for earlier in run_stages
+            if earlier.stage == stats.stage and getattr(earlier, metric) is not None
+        ]
+        if len(values) < BASELINE_MIN_RUNS:
+            continue
+        baseline = median(values)
+        report.baseline[metric] = baseline
+        value = getattr(stats, metric)
+        if (
+            value is not None
+            and value > baseline * REGRESSION_FACTOR
+            and value - baseline >= min_increase
+        ):
+            report.regressions.append(metric)
+    return report
@@ -1,29 +1,502 @@
+import csv
+import os
+import threading
+import weakref
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from io import StringIO
+from typing import Iterator
 from uuid import UUID
 
-from ..models.listings import Listing
+import psycopg
+
+from ..models.listings import (
+    LISTING_CSV_HEADER,
+    Listing,
+    ListingChanges,
+    ListingCursor,
+    ListingFacets,
+    ListingFilters,
+    ListingSort,
+)
 from ..util.db import get_db_connection
+from ..util.snapshot import Snapshot, bump_data_version, set_data_version
+
+LISTING_COLUMNS = """
+    l.id, l.source, l.title, l.active,
+    l.date_updated, l.is_visible, l.date_posted, l.url,
+    l.locations, l.terms, l.sponsorship,
+    l.category, l.faang_plus,
+    c.id AS company_id, c.name, c.url, c.logo_url,
+    l.archived
+"""
+
+
+# rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 2000
+# an export holds a pooled connection, with its transaction open, until its client has
+# read the whole response; each worker runs at most EXPORT_SLOTS at once and turns the
+# rest away with a 503, so slow clients can't take the connections other requests need
+EXPORT_SLOTS = int(os.getenv("EXPORT_SLOTS", "2"))
+export_slots = threading.BoundedSemaphore(EXPORT_SLOTS)
+
+# days removed listings are reported to GET /listings/changes; clients that last synced
+# longer ago than that get a 410 and sync again from scratch
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+# ordering column, its type and direction for each sort order (ties broken on l.id);
+# company order walks companies by their name index and each one's listings by
+# listings_company_id_idx, which needs the inner join (company_id is never NULL)
+LISTING_SORTS = {
+    ListingSort.NEWEST: ("l.date_posted", "timestamptz", "DESC"),
+    ListingSort.UPDATED: ("l.date_updated", "timestamptz", "DESC"),
+    ListingSort.COMPANY: ("c.name", "text", "ASC"),
+    ListingSort.RELEVANCE: ("r.rank", "float8", "DESC"),
+}
+
+# full-text rank plus trigram word similarity, so misspelled searches still score
+SEARCH_RANK = """
+    CROSS JOIN LATERAL (
+        SELECT (
+            ts_rank(l.search_vector, websearch_to_tsquery('english', %s))
+            + word_similarity(%s, l.title)
+            + word_similarity(%s, c.name)
+        )::FLOAT8 AS rank
+    ) r
+"""
+
+
+def build_listing_filters(filters: ListingFilters):
+    """builds the WHERE conditions (on alias l) and their params for the filters"""
+    conditions: list[str] = []
+    params: list = []
+
+    # a constant rather than a parameter, so the planner prunes the other partition
+    conditions.append("l.archived" if filters.archived else "NOT l.archived")
+    if filters.category:
+        conditions.append("l.category = ANY(%s)")
+        params.append(filters.category)
+    if filters.faang_plus is not None:
+        conditions.append("l.faang_plus = %s")
+        params.append(filters.faang_plus)
+    if filters.terms:
+        conditions.append("l.terms && %s")
+        params.append(filters.terms)
+    if filters.sponsorship:
+        conditions.append("l.sponsorship = ANY(%s)")
+        params.append(filters.sponsorship)
+    if filters.active is not None:
+        conditions.append("l.active = %s")
+        params.append(filters.active)
+    if filters.locations:
+        conditions.append("l.locations && %s")
+        params.append(filters.locations)
+    if filters.q:
+        conditions.append(
+            """(
+                l.search_vector @@ websearch_to_tsquery('english', %s)
+                OR %s <%% l.title
+                OR l.company_id = ANY(ARRAY(SELECT id FROM companies WHERE %s <%% name))
+            )"""
+        )
+        params += [filters.q] * 3
+
+    return conditions, params
+
+
+def build_listings_query(filters: ListingFilters, cursor: ListingCursor | None = None):
+    """
+    builds the ordered SELECT of listings matching the filters, starting after
+    the cursor (without a LIMIT); the last column is the sort key
+    """
+    sort_column, sort_type, order = LISTING_SORTS[filters.sort]
+    if cursor is not None and cursor.backwards:
+        order = "ASC" if order == "DESC" else "DESC"
+
+    rank_join, params = "", []
+    if filters.sort == ListingSort.RELEVANCE:
+        rank_join = SEARCH_RANK
+        params += [filters.q] * 3
+
+    conditions, filter_params = build_listing_filters(filters)
+    params += filter_params
+    if cursor is not None:
+        # the bound on the sort column alone lets an index on it seek to the cursor
+        comparison = ">" if order == "ASC" else "<"
+        conditions.append(f"{sort_column} {comparison}= %s::{sort_type}")
+        conditions.append(f"({sort_column}, l.id) {comparison} (%s::{sort_type}, %s)")
+        params += [cursor.key, cursor.key, cursor.id]
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
+    query = f"""
+        SELECT {LISTING_COLUMNS}, {sort_column} AS sort_key
+        FROM listings l
+        JOIN companies c ON l.company_id = c.id
+        {rank_join}
+        {where_clause}
+        ORDER BY {sort_column} {order}, l.id {order}
+    """
+    return query, params
+
+
+def get_listings_page_from_db(
+    filters: ListingFilters, page_size: int, cursor: ListingCursor | None = None
+):
+    """
+    reads one page of filtered listings in the requested sort order
+
+    returns the page along with the cursors of the next and previous pages
+    """
+    backwards = cursor is not None and cursor.backwards
+    query, params = build_listings_query(filters, cursor)
 
-def get_listings_from_db():
     with get_db_connection() as conn:
         with conn.cursor() as cur:
+            # fetch one extra row to know whether another page follows
+            cur.execute(f"{query} LIMIT %s;", params + [page_size + 1])
+
+            rows = cur.fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    listings = [Listing.from_tuple(row) for row in rows]
+
+    def row_cursor(row: tuple, backwards: bool = False):
+        sort_key = row[-1]
+        key = sort_key.isoformat() if isinstance(sort_key, datetime) else str(sort_key)
+        return ListingCursor(sort=filters.sort, key=key, id=row[0], backwards=backwards)
+
+    next_cursor, prev_cursor = None, None
+    if rows:
+        if has_more or backwards:
+            next_cursor = row_cursor(rows[-1])
+        if (has_more and backwards) or (cursor is not None and not backwards):
+            prev_cursor = row_cursor(rows[0], backwards=True)
+
+    return listings, next_cursor, prev_cursor
+
+
+def stream_listings_from_db(filters: ListingFilters) -> Iterator[list[tuple]]:
+    """
+    yields every listing row matching the filters in batches, read through a
+    server-side cursor so memory stays constant regardless of the result size
+    """
+    query, params = build_listings_query(filters)
+
+    with get_db_connection() as conn:
+        with conn.cursor(name="listings_export") as cur:
+            cur.itersize = EXPORT_BATCH_SIZE
+            cur.execute(query, params)
+            while rows := cur.fetchmany(EXPORT_BATCH_SIZE):
+                yield rows
+
+
+def hold_export_slot(chunks: Iterator[bytes]) -> Iterator[bytes] | None:
+    """
+    streams chunks holding an export slot, released once they end or are closed (or
+    the stream is garbage collected without having started), or returns None if
+    every slot is taken
+    """
+    if not export_slots.acquire(blocking=False):
+        return None
+
+    def held() -> Iterator[bytes]:
+        try:
+            yield from chunks
+        finally:
+            release()
+
+    stream = held()
+    # releases at most once, whichever comes first
+    release = weakref.finalize(stream, export_slots.release)
+    return stream
+
+
+def export_listings_ndjson(filters: ListingFilters) -> Iterator[bytes]:
+    """yields the matching listings as newline-delimited JSON, one chunk per batch"""
+    for rows in stream_listings_from_db(filters):
+        yield b"".join(
+            Listing.from_tuple(row).model_dump_json().encode() + b"\n" for row in rows
+        )
+
+
+def export_listings_csv(filters: ListingFilters) -> Iterator[bytes]:
+    """yields the matching listings as CSV with a header row, one chunk per batch"""
+    buf = StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(LISTING_CSV_HEADER)
+
+    for rows in stream_listings_from_db(filters):
+        writer.writerows(Listing.from_tuple(row).to_csv_row() for row in rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+
+    # header only when nothing matched
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def count_listings_in_db(filters: ListingFilters) -> int:
+    """
+    gets the number of listings matching the filters
+
+    Unfiltered counts come from the planner statistics of the current listings
+    partition, which autovacuum keeps up to date, falling back to an exact count
+    if never analyzed.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if not filters.is_empty():
+                conditions, params = build_listing_filters(filters)
+                cur.execute(
+                    f"SELECT COUNT(*) FROM listings l WHERE {' AND '.join(conditions)};",
+                    params,
+                )
+                row = cur.fetchone()
+                return row[0] if row is not None else 0
+
             cur.execute(
                 """
-                SELECT
-                    l.id, l.source, l.title, l.active,
-                    l.date_updated, l.is_visible, l.date_posted, l.url,
-                    l.locations, l.terms, l.sponsorship,
-                    l.category, l.faang_plus,
-                    c.id AS company_id, c.name, c.url, c.logo_url
+                SELECT reltuples::BIGINT
+                FROM pg_class
+                WHERE oid = 'listings_current'::regclass;
+                """
+            )
+            row = cur.fetchone()
+            if row is not None and row[0] >= 0:
+                return row[0]
+
+            cur.execute("SELECT COUNT(*) FROM listings_current;")
+            row = cur.fetchone()
+            return row[0] if row is not None else 0
+
+
+# value expression, extra join and the filter it narrows for each facet
+LISTING_FACETS = {
+    "category": ("l.category", "", "category"),
+    "terms": ("t.term", "CROSS JOIN unnest(l.terms) AS t(term)", "terms"),
+    "sponsorship": ("l.sponsorship", "", "sponsorship"),
+    "faang_plus": ("l.faang_plus::TEXT", "", "faang_plus"),
+    "company": ("c.name", "JOIN companies c ON l.company_id = c.id", None),
+}
+
+
+def get_facets_from_db():
+    """reads the facet counts precomputed at ingest time"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT facet, value, count FROM listing_facets;")
+
+            rows = cur.fetchall()
+
+    return ListingFacets.from_rows(rows)
+
+
+def count_facets_in_db(filters: ListingFilters):
+    """
+    counts the facets among listings matching the filters, where each facet
+    ignores its own filter so the alternatives to the current selection show
+    """
+    selects: list[str] = []
+    params: list = []
+    for facet, (value, join, own_filter) in LISTING_FACETS.items():
+        facet_filters = filters
+        if own_filter is not None:
+            default = ListingFilters.model_fields[own_filter].get_default()
+            facet_filters = filters.model_copy(update={own_filter: default})
+        conditions, facet_params = build_listing_filters(facet_filters)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        selects.append(
+            f"""
+            SELECT %s, {value}, COUNT(*)
+            FROM listings l
+            {join}
+            {where_clause}
+            GROUP BY {value}
+            """
+        )
+        params += [facet] + facet_params
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(" UNION ALL ".join(selects), params)
+
+            rows = cur.fetchall()
+
+    return ListingFacets.from_rows(rows)
+
+
+def refresh_facets_in_db(cur: psycopg.Cursor):
+    """recomputes the facet counts within the caller's transaction"""
+    cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY listing_facets;")
+
+
+# unfiltered facet counts, kept per data version
+facets_snapshot = Snapshot(get_facets_from_db)
+
+
+def record_tombstone(cur: psycopg.Cursor, listing_id: UUID, version: int):
+    """remembers that a listing was removed at version, for delta sync"""
+    cur.execute(
+        """
+        INSERT INTO listing_tombstones (id, version)
+        VALUES (%s, %s)
+        ON CONFLICT (id) DO UPDATE
+            SET version = EXCLUDED.version, removed_at = EXCLUDED.removed_at;
+        """,
+        (listing_id, version),
+    )
+
+
+def prune_tombstones_in_db() -> int:
+    """
+    deletes tombstones older than TOMBSTONE_RETENTION_DAYS, returning how many; syncs
+    from before the newest one pruned can no longer be answered with changes
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                WITH pruned AS (
+                    DELETE FROM listing_tombstones
+                    WHERE removed_at < NOW() - make_interval(days => %s)
+                    RETURNING version
+                )
+                UPDATE listings_state
+                SET tombstones_pruned_version = GREATEST(
+                    tombstones_pruned_version, (SELECT MAX(version) FROM pruned)
+                )
+                RETURNING (SELECT COUNT(*) FROM pruned);
+                """,
+                (TOMBSTONE_RETENTION_DAYS,),
+            )
+            row = cur.fetchone()
+    return row[0] if row is not None else 0
+
+
+def get_listing_changes_from_db(since: int) -> ListingChanges | None:
+    """
+    gets the listings written and the IDs removed after version since, or None if
+    tombstones after since were pruned, so the client has to sync from scratch
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # read the version first, so rows from a concurrent ingest can only
+            # be sent twice rather than skipped
+            cur.execute("SELECT version FROM listings_state;")
+            row = cur.fetchone()
+            version = row[0] if row is not None else 0
+
+            cur.execute(
+                f"""
+                SELECT {LISTING_COLUMNS}
                 FROM listings l
-                LEFT JOIN companies c ON l.company_id = c.id;
+                LEFT JOIN companies c ON l.company_id = c.id
+                WHERE l.version > %s AND NOT l.archived;
+                """,
+                (since,),
+            )
+            upserted = [Listing.from_tuple(row) for row in cur.fetchall()]
+
+            # a client syncing from scratch has nothing to remove
+            if since == 0:
+                return ListingChanges(version=version, upserted=upserted, removed=[])
+
+            # listings removed (archived or deleted) and later re-added only count as upserted
+            cur.execute(
+                """
+                SELECT t.id
+                FROM listing_tombstones t
+                WHERE t.version > %s
+                AND NOT EXISTS (
+                    SELECT 1 FROM listings l WHERE l.id = t.id AND NOT l.archived
+                );
+                """,
+                (since,),
+            )
+            removed = [row[0] for row in cur.fetchall()]
+
+            # read after the tombstones, so a prune committed in between is noticed
+            cur.execute("SELECT tombstones_pruned_version FROM listings_state;")
+            row = cur.fetchone()
+            if row is not None and since < row[0]:
+                return None
+
+    return ListingChanges(version=version, upserted=upserted, removed=removed)
+
+
+class SortedListings:
+    """all listings in the default (date_posted, id) order, paged like the DB query"""
+
+    def __init__(self, listings: list[Listing]):
+        # kept oldest first so the keys can be bisected
+        self.listings = sorted(listings, key=lambda l: (l.date_posted, l.id))
+        self.keys = [(l.date_posted, l.id) for l in self.listings]
+
+    def __len__(self):
+        return len(self.listings)
+
+    def page(self, page_size: int, cursor: ListingCursor | None = None):
+        """same contract as get_listings_page_from_db for unfiltered, newest first pages"""
+        backwards = cursor is not None and cursor.backwards
+
+        if cursor is None:
+            end = len(self.keys)
+            start = max(0, end - page_size)
+            has_more = start > 0
+        else:
+            key = (datetime.fromisoformat(cursor.key), cursor.id)
+            if backwards:
+                start = bisect_right(self.keys, key)
+                end = min(len(self.keys), start + page_size)
+                has_more = end < len(self.keys)
+            else:
+                end = bisect_left(self.keys, key)
+                start = max(0, end - page_size)
+                has_more = start > 0
+        listings = self.listings[start:end][::-1]
+
+        def listing_cursor(listing: Listing, backwards: bool = False):
+            return ListingCursor(
+                sort=ListingSort.NEWEST,
+                key=listing.date_posted.isoformat(),
+                id=listing.id,
+                backwards=backwards,
+            )
+
+        next_cursor, prev_cursor = None, None
+        if listings:
+            if has_more or backwards:
+                next_cursor = listing_cursor(listings[-1])
+            if (has_more and backwards) or (cursor is not None and not backwards):
+                prev_cursor = listing_cursor(listings[0], backwards=True)
+
+        return listings, next_cursor, prev_cursor
+
+
+def load_sorted_listings():
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT {LISTING_COLUMNS}
+                FROM listings l
+                LEFT JOIN companies c ON l.company_id = c.id
+                WHERE NOT l.archived;
                 """
             )
 
             rows = cur.fetchall()
 
-            listings = [Listing.from_tuple(row) for row in rows]
-            return listings
+    return SortedListings([Listing.from_tuple(row) for row in rows])
+
+
+# unfiltered current listings, rebuilt once per data version (i.e. per ingest or delete)
+listings_snapshot = Snapshot(load_sorted_listings)
 
 
 def delete_listing_in_db(listing_id: UUID):
@@ -38,5 +511,12 @@ def delete_listing_in_db(listing_id: UUID):
                 (listing_id,),
             )
             deleted = cur.fetchone()
+            version = None
+            if deleted is not None:
+                version = bump_data_version(cur)
+                record_tombstone(cur, listing_id, version)
+                refresh_facets_in_db(cur)
 
+    if version is not None:
+        set_data_version(version)
     return deleted is not None
@@ -0,0 +1,232 @@
+import math
+import os
+import time
+from threading import Lock
+from typing import Annotated
+
+import psycopg
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+from ..models.auth import User
+from .auth import get_user, oauth2_scheme
+from .cache import TTLCache
+from .db import get_db_connection
+
+# "memory" counts requests per worker; "postgres" shares the counts between workers,
+# at the cost of a database round trip per limited request
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+# Vercel sets X-Forwarded-For to the client's address; elsewhere it can be spoofed
+TRUST_FORWARDED_FOR = os.getenv("VERCEL_ENV") is not None
+
+# keys tracked per limit in memory, evicting the least recently seen
+MAX_KEYS = 100000
+# how often the postgres store deletes counts of windows that have passed
+PRUNE_SECONDS = 60
+
+
+def roll(stored_bucket: int, count: int, previous: int, bucket: int) -> tuple[int, int]:
+    """counts of bucket and the one before it, from counts stored at stored_bucket"""
+    if stored_bucket == bucket:
+        return count, previous
+    if stored_bucket == bucket - 1:
+        return 0, count
+    return 0, 0
+
+
+class MemoryStore:
+    """request counts of this worker"""
+
+    def __init__(self, window: float):
+        self.lock = Lock()
+        self.counts: TTLCache[str, tuple[int, int, int]] = TTLCache(
+            max_size=MAX_KEYS, ttl=2 * window
+        )
+
+    def hit(
+        self, key: str, bucket: int, weight: float, limit: int
+    ) -> tuple[bool, int, int]:
+        """
+        counts a request in bucket if that keeps the estimate within limit, returning
+        whether it did along with the bucket's count and the previous bucket's
+        """
+        with self.lock:
+            entry = self.counts.get(key)
+            count, previous = roll(*entry, bucket) if entry else (0, 0)
+            allowed = previous * weight + count + 1 <= limit
+            if allowed:
+                count += 1
+                self.counts.set(key, (bucket, count, previous))
+            return allowed, count, previous
+
+
+class PostgresStore:
+    """request counts shared by every worker, in the rate_limits table"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self.pruned_at = 0.0
+
+    def hit(
+        self, key: str, bucket: int, weight: float, limit: int
+    ) -> tuple[bool, int, int]:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                # counts the request only if it's allowed, in one statement so
+                # concurrent requests from other workers can't both take the last one
+                cur.execute(
+                    """
+                    INSERT INTO rate_limits AS r (key, bucket, count, previous, expires_at)
+                    VALUES (
+                        %(key)s, %(bucket)s, 1, 0,
+                        NOW() + make_interval(secs => %(ttl)s)
+                    )
+                    ON CONFLICT (key) DO UPDATE SET
+                        previous = CASE
+                            WHEN r.bucket = EXCLUDED.bucket THEN r.previous
+                            WHEN r.bucket = EXCLUDED.bucket - 1 THEN r.count
+                            ELSE 0
+                        END,
+                        count = CASE
+                            WHEN r.bucket = EXCLUDED.bucket THEN r.count + 1
+                            ELSE 1
+                        END,
+                        bucket = EXCLUDED.bucket,
+                        expires_at = EXCLUDED.expires_at
+                    WHERE (
+                        CASE
+                            WHEN r.bucket = EXCLUDED.bucket THEN r.previous
+                            WHEN r.bucket = EXCLUDED.bucket - 1 THEN r.count
+                            ELSE 0
+                        END * %(weight)s
+                        + CASE WHEN r.bucket = EXCLUDED.bucket THEN r.count ELSE 0 END
+                        + 1
+                    ) <= %(limit)s
+                    RETURNING count, previous
+                    """,
+                    {
+                        "key": key,
+                        "bucket": bucket,
+                        "ttl": 2 * self.window,
+                        "weight": weight,
+                        "limit": limit,
+                    },
+                )
+                row = cur.fetchone()
+                allowed = row is not None
+                if row is None:
+                    cur.execute(
+                        "SELECT bucket, count, previous FROM rate_limits WHERE key = %s",
+                        (key,),
+                    )
+                    stored = cur.fetchone()
+                    row = roll(*stored, bucket) if stored else (0, 0)
+
+                if time.monotonic() - self.pruned_at >= PRUNE_SECONDS:
+                    self.pruned_at = time.monotonic()
+                    cur.execute("DELETE FROM rate_limits WHERE expires_at < NOW()")
+            conn.commit()
+        return allowed, row[0], row[1]
+
+
+class RateLimit:
+    """
+    allows up to limit requests per client in any window of that many seconds
+
+    The count over the last window is estimated from fixed buckets as the current
+    bucket's count plus the previous bucket's, weighted by how much of it still
+    overlaps the window. Only allowed requests are counted.
+    """
+
+    def __init__(self, scope: str, limit: int, window: float):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+        self.store = (
+            PostgresStore(window)
+            if RATE_LIMIT_STORE == "postgres"
+            else MemoryStore(window)
+        )
+
+    def check(self, key: str):
+        """counts a request from key, raising 429 if it's over the limit"""
+        bucket, offset = divmod(time.time(), self.window)
+        weight = 1 - offset / self.window
+        try:
+            allowed, count, previous = self.store.hit(
+                f"{self.scope}:{key}", int(bucket), weight, self.limit
+            )
+        except (psycopg.Error, HTTPException) as e:
+            # let requests through rather than fail them because the store is down
+            print(f"Rate limit store error in {self.scope}: {e}")
+            return
+
+        if allowed:
+            return
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(self.retry_after(count, previous, offset))},
+        )
+
+    def retry_after(self, count: int, previous: int, offset: float) -> int:
+        """seconds until another request from the key would be allowed"""
+        if count + 1 > self.limit:
+            # wait out this bucket, then until enough of it has left the window
+            wait = self.window - offset
+            wait += max(0.0, self.window * (1 - (self.limit - 1) / count))
+        else:
+            wait = self.window * (1 - (self.limit - count - 1) / previous) - offset
+        return max(1, math.ceil(wait))
+
+    async def acquire(self, key: str):
+        if isinstance(self.store, PostgresStore):
+            await run_in_threadpool(self.check, key)
+        else:
+            self.check(key)
+
+
+def get_client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class IPRateLimit(RateLimit):
+    """route dependency limiting requests per client IP address"""
+
+    async def __call__(self, request: Request):
+        await self.acquire(get_client_ip(request))
+
+
+class UserRateLimit(RateLimit):
+    """route dependency limiting requests per signed-in user"""
+
+    async def __call__(self, user: Annotated[User, Depends(get_user)]):
+        await self.acquire(str(user.id))
+
+    def route_class(self) -> type[APIRoute]:
+        """
+        route class checking the limit before the request body is read, for uploads
+
+        FastAPI reads and parses a form before it resolves any dependency, so as a
+        dependency the limit would only be checked once the upload was taken in.
+        """
+        limit = self
+
+        class RateLimitedRoute(APIRoute):
+            def get_route_handler(self):
+                handler = super().get_route_handler()
+
+                async def limited_handler(request: Request) -> Response:
+                    token = await oauth2_scheme(request)
+                    user = await run_in_threadpool(get_user, token)
+                    await limit.acquire(str(user.id))
+                    return await handler(request)
+
+                return limited_handler
+
+        return RateLimitedRoute
@@ -0,0 +1,125 @@
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Generic, TypeVar
+
+import psycopg
+
+from .db import get_db_connection
+
+T = TypeVar("T")
+
+# how long a worker trusts its last known data version before re-reading it
+VERSION_CHECK_SECONDS = 60
+# serve cached, pre-serialized page bodies for snapshot-backed endpoints
+PRERENDER_RESPONSES = os.getenv("PRERENDER_RESPONSES", "true").lower() != "false"
+# rendered bodies kept per snapshot (one per distinct request URL), least recently
+# used first out; bounded by total size too, as any page size or cursor makes a new URL
+MAX_RENDERED = 512
+MAX_RENDERED_BYTES = 32 << 20
+# bodies larger than this are rendered for every request rather than kept
+MAX_RENDERED_BODY_BYTES = MAX_RENDERED_BYTES // 16
+
+_version_lock = Lock()
+_known_version: int | None = None
+_checked_at = 0.0
+
+
+def get_data_version() -> int:
+    """gets the listing data version, re-reading it at most every VERSION_CHECK_SECONDS"""
+    global _known_version, _checked_at
+
+    with _version_lock:
+        if (
+            _known_version is not None
+            and time.monotonic() - _checked_at < VERSION_CHECK_SECONDS
+        ):
+            return _known_version
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version FROM listings_state;")
+            row = cur.fetchone()
+            version = row[0] if row is not None else 0
+
+    set_data_version(version)
+    return version
+
+
+def bump_data_version(cur: psycopg.Cursor) -> int:
+    """
+    increments the listing data version within the caller's transaction
+
+    Call set_data_version with the result once the transaction commits.
+    """
+    cur.execute(
+        """
+        UPDATE listings_state
+        SET version = version + 1
+        RETURNING version;
+        """
+    )
+    row = cur.fetchone()
+    assert row is not None, "listings_state is missing its row"
+    return row[0]
+
+
+def set_data_version(version: int):
+    """records a data version this worker has seen committed"""
+    global _known_version, _checked_at
+
+    with _version_lock:
+        if _known_version is None or version >= _known_version:
+            _known_version = version
+            _checked_at = time.monotonic()
+
+
+class Snapshot(Generic[T]):
+    """in-process copy of data that is rebuilt once per data version"""
+
+    def __init__(self, loader: Callable[[], T]):
+        self.loader = loader
+        self.lock = Lock()
+        self.version: int | None = None
+        self.value: T | None = None
+        self.rendered: OrderedDict[str, bytes] = OrderedDict()
+        self.rendered_bytes = 0
+
+    def get(self) -> T:
+        # read the version before loading, so a concurrent write can only make
+        # the snapshot rebuild again rather than be labelled newer than it is
+        version = get_data_version()
+        with self.lock:
+            if self.value is None or self.version != version:
+                self.value = self.loader()
+                self.version = version
+                self.rendered.clear()
+                self.rendered_bytes = 0
+            return self.value
+
+    def render(self, key: str, renderer: Callable[[T], bytes]) -> bytes:
+        """gets the body rendered from this version of the snapshot for key, rendering it once"""
+        value = self.get()
+        with self.lock:
+            body = self.rendered.get(key)
+            if body is not None:
+                self.rendered.move_to_end(key)
+                return body
+
+        body = renderer(value)
+        with self.lock:
+            # only keep it if the snapshot wasn't rebuilt while rendering
+            if (
+                self.value is value
+                and key not in self.rendered
+                and len(body) <= MAX_RENDERED_BODY_BYTES
+            ):
+                self.rendered[key] = body
+                self.rendered_bytes += len(body)
+                while (
+                    len(self.rendered) > MAX_RENDERED
+                    or self.rendered_bytes > MAX_RENDERED_BYTES
+                ):
+                    self.rendered_bytes -= len(self.rendered.popitem(last=False)[1])
+        return body
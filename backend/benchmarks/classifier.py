@@ -0,0 +1,53 @@
+"""
+Titles/sec for classifyJobCategory and companies/sec for classifyFaangPlus on
+synthetic internship titles. Needs no database.
+
+Run from backend/:
+    python -m benchmarks.classifier
+"""
+
+import random
+import time
+
+TITLES = 200000
+REPEATS = 3
+
+WORDS = """
+software engineer intern data science machine learning hardware embedded quant
+trading product manager analyst research marketing sales operations finance
+business summer 2026 fall co-op new grad backend frontend mobile ios android
+security it support help desk associate program coordinator design ux legal hr
+people recruiting supply chain mechanical electrical civil chemical biology
+""".split()
+COMPANIES = ["Google", "Acme", "Meta", "Jane Street", "Stripe", "Initech", "X"]
+
+
+def best_rate(count: int, run):
+    best = 0.0
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+def main():
+    from app.util.cron import classifyFaangPlus, classifyJobCategory
+
+    rand = random.Random(1)
+    jobs = [
+        {
+            "title": " ".join(rand.choices(WORDS, k=rand.randint(2, 6))).title(),
+            "company_name": rand.choice(COMPANIES),
+        }
+        for _ in range(TITLES)
+    ]
+
+    categories = best_rate(len(jobs), lambda: [classifyJobCategory(j) for j in jobs])
+    faang_plus = best_rate(len(jobs), lambda: [classifyFaangPlus(j) for j in jobs])
+    print(f"classifyJobCategory: {categories:>12,.0f} titles/s")
+    print(f"classifyFaangPlus:   {faang_plus:>12,.0f} companies/s")
+
+
+if __name__ == "__main__":
+    main()
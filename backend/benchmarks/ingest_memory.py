@@ -0,0 +1,89 @@
+"""
+Peak traced memory and time to parse a listings.json feed during ingest, on a
+synthetic feed shaped like the SimplifyJobs one. Needs no database.
+
+Run from backend/:
+    python -m benchmarks.ingest_memory [listings]
+"""
+
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+LISTINGS = 30000
+
+TITLES = [
+    "Software Engineer Intern",
+    "Hardware Engineering Intern",
+    "Quantitative Trader Intern",
+    "Data Science Intern",
+    "Product Manager Intern",
+    "Firmware Engineer Intern",
+    "Machine Learning Research Intern",
+    "IT Support Intern",
+    "Frontend Developer Intern",
+    "Marketing Intern",
+]
+COMPANIES = ["Google", "Nvidia", "Stripe", "Meta", "Tesla", "Acme", "Initech"]
+LOCATIONS = ["New York, NY", "San Francisco, CA", "Remote", "Austin, TX"]
+SPONSORSHIP = ["Offers Sponsorship", "Does Not Offer Sponsorship", "Other"]
+
+
+def synthetic_listings(count: int, seed: int = 1):
+    """raw feed entries with the fields ingest reads (plus a few it ignores)"""
+    rand = random.Random(seed)
+    for i in range(count):
+        company = rand.choice(COMPANIES)
+        posted = 1700000000 + rand.randint(0, 30000000)
+        yield {
+            "id": str(uuid.UUID(int=rand.getrandbits(128))),
+            "source": "Simplify",
+            "company_name": company,
+            "company_url": f"https://simplify.jobs/c/{company}",
+            "title": f"{rand.choice(TITLES)} {i}",
+            "active": rand.random() < 0.8,
+            "date_updated": posted + 100,
+            "is_visible": True,
+            "date_posted": posted,
+            "url": f"https://jobs.example.com/{i}",
+            "locations": rand.sample(LOCATIONS, 2),
+            "terms": ["Summer 2026"],
+            "sponsorship": rand.choice(SPONSORSHIP),
+            "season": "Summer",
+            "degrees": ["Bachelor's"],
+            "category": "Software",
+        }
+
+
+def main():
+    from app.models.cron import ListingSource
+    from app.util.cron import parse_listings
+
+    source = ListingSource(name="synthetic", urls=[])
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else LISTINGS
+    with tempfile.TemporaryFile() as file:
+        file.write(json.dumps(list(synthetic_listings(count))).encode())
+        size = file.tell()
+        file.seek(0)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        listings, _ = parse_listings(file, source, stored={})
+        elapsed = time.perf_counter() - start
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    mb = 2**20
+    print(f"feed:      {size / mb:.1f} MB, {len(listings)} listings")
+    print(f"time:      {elapsed:.2f} s")
+    print(f"peak:      {peak / mb:.1f} MB")
+    print(f"retained:  {retained / mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
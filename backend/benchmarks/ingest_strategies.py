@@ -0,0 +1,102 @@
+"""
+Wall-clock time for insert_listings' DB write strategies (COPY into a staging
+table vs. one upsert per row) on synthetic feeds, for a first load into an
+empty table and for a nightly re-ingest where 5% of listings changed, 1% were
+removed and 1% are new.
+
+Each run happens in a transaction that is rolled back, so the database in
+DATABASE_URL is left as it was (commit/fsync time is therefore not included).
+
+Run from backend/:
+    python -m benchmarks.ingest_strategies [listings ...]
+"""
+
+import sys
+import time
+from dataclasses import replace
+from itertools import islice
+
+from benchmarks.ingest_memory import synthetic_listings
+
+SIZES = [20000, 100000]
+FEED = "synthetic"
+
+
+def make_listings(raw_listings):
+    from app.models.listings import ListingRecord
+    from app.util.cron import classify_listings
+
+    listings = [ListingRecord.from_json(raw, FEED) for raw in raw_listings]
+    classify_listings(listings, categories={})
+    return listings
+
+
+def nightly_feed(listings: list):
+    """the next night's feed: 5% retitled, 1% dropped and 1% new listings"""
+    count = len(listings)
+    kept = [
+        replace(l, title=l.title + " (Updated)") if i % 20 == 0 else l
+        for i, l in enumerate(listings[: count - count // 100])
+    ]
+    new = make_listings(islice(synthetic_listings(count + count // 100), count, None))
+    return kept + new
+
+
+def assign_company_ids(cur, listings: list):
+    names = sorted({l.company_name for l in listings})
+    cur.executemany(
+        "INSERT INTO companies (name, url) VALUES (%s, %s) ON CONFLICT (name) DO NOTHING;",
+        [(name, f"https://example.com/{name}") for name in names],
+    )
+    cur.execute("SELECT name, id FROM companies WHERE name = ANY(%s);", (names,))
+    ids = dict(cur.fetchall())
+    for l in listings:
+        l.company_id = ids[l.company_name]
+
+
+def measure(strategy, listings: list, nightly: list):
+    from app.util.cron import write_listings_copy, write_listings_executemany
+    from app.util.db import get_db_connection
+
+    write = {
+        "copy": write_listings_copy,
+        "executemany": write_listings_executemany,
+    }[strategy.value]
+
+    with get_db_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                assign_company_ids(cur, listings + nightly)
+                cur.execute("DELETE FROM listings;")
+
+                start = time.perf_counter()
+                write(cur, listings, [FEED], 1)
+                first = time.perf_counter() - start
+                # each strategy drops its staging table at commit
+                cur.execute("DROP TABLE IF EXISTS tmp_listings, tmp_listing_ids;")
+
+                start = time.perf_counter()
+                summary = write(cur, nightly, [FEED], 2)
+                again = time.perf_counter() - start
+        finally:
+            conn.rollback()
+    return first, again, summary
+
+
+def main():
+    from app.models.cron import IngestStrategy
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'listings':>9}  {'strategy':<12}{'first load':>12}{'nightly':>10}")
+    for size in sizes:
+        listings = make_listings(synthetic_listings(size))
+        nightly = nightly_feed(listings)
+
+        for strategy in IngestStrategy:
+            first, again, summary = measure(strategy, listings, nightly)
+            print(f"{size:>9}  {strategy.value:<12}{first:>11.2f}s{again:>9.2f}s")
+        print(f"{'':>11}nightly: {summary.model_dump()}")
+
+
+if __name__ == "__main__":
+    main()
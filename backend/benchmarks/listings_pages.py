@@ -0,0 +1,74 @@
+"""
+Requests/sec for the snapshot-backed GET /listings and GET /companies pages,
+served as pre-serialized bodies (PRERENDER_RESPONSES=true) vs. validated and
+serialized by pydantic/FastAPI on every request (PRERENDER_RESPONSES=false).
+
+Run from backend/ against a database that already has listings:
+    python -m benchmarks.listings_pages
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+REQUESTS = 2000
+PAGE_SIZE = 100
+
+
+async def measure():
+    import httpx
+
+    from app.main import app
+
+    # in-process ASGI calls, so only the app's own work is measured
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        first = await client.get("/listings/", params={"pageSize": PAGE_SIZE})
+        urls = {
+            "listings (first page)": f"/listings/?pageSize={PAGE_SIZE}",
+            "companies (first page)": f"/companies/?pageSize={PAGE_SIZE}",
+        }
+        if first.json()["next"]:
+            urls["listings (second page)"] = first.json()["next"]
+
+        results = {}
+        for name, url in urls.items():
+            await client.get(url)  # warm the snapshot and rendered body
+            start = time.perf_counter()
+            for _ in range(REQUESTS):
+                await client.get(url)
+            results[name] = REQUESTS / (time.perf_counter() - start)
+    print(json.dumps(results))
+
+
+def main():
+    runs = {}
+    for prerender in ("false", "true"):
+        env = {**os.environ, "PRERENDER_RESPONSES": prerender, "BENCH_CHILD": "1"}
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.listings_pages"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs[prerender] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(
+        f"{'endpoint':<26}{'validated req/s':>18}{'prerendered req/s':>20}{'speedup':>10}"
+    )
+    for name, slow in runs["false"].items():
+        fast = runs["true"][name]
+        print(f"{name:<26}{slow:>18.0f}{fast:>20.0f}{fast / slow:>9.1f}x")
+
+
+if __name__ == "__main__":
+    if os.getenv("BENCH_CHILD"):
+        asyncio.run(measure())
+    else:
+        main()
@@ -0,0 +1,133 @@
+"""
+Latency of GET /listings while a storm of concurrent logins runs, with bcrypt
+in FastAPI's shared request threadpool (as before) vs. in its own bounded pool
+that turns away logins past PASSWORD_HASH_QUEUE with a 503.
+
+Registers a throwaway user, which is deleted afterwards. Hashes use
+BCRYPT_ROUNDS=10 unless set, since at the default 12 the shared pool takes
+several seconds per listing request and the run takes minutes.
+
+Run from backend/ against a database that already has listings:
+    python -m benchmarks.login_storm [concurrent logins]
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from statistics import quantiles
+
+STORM = 64
+SAMPLES = 200
+PASSWORD = "benchmark-password"
+
+
+async def login_loop(client, username: str, stop: asyncio.Event, counts: dict):
+    while not stop.is_set():
+        response = await client.post(
+            "/auth/login", data={"username": username, "password": PASSWORD}
+        )
+        if not stop.is_set():
+            counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            # a well-behaved client backs off as asked
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+
+async def measure(storm: int):
+    import httpx
+
+    from app.main import app
+    from app.util import auth
+    from app.util.db import get_db_connection
+
+    if os.getenv("BENCH_HASH_POOL") == "shared":
+        from fastapi.concurrency import run_in_threadpool
+
+        auth.run_hash = lambda fn, *args: run_in_threadpool(fn, *args)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="https://bench", timeout=None
+    ) as client:
+        username = f"bench-{uuid.uuid4().hex[:12]}"
+        response = await client.post(
+            "/auth/register", data={"username": username, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        user_id = auth.get_user_from_db(username).id
+
+        try:
+            await client.get("/listings/")  # warm the snapshot
+
+            stop = asyncio.Event()
+            counts: dict[int, int] = {}
+            storm_start = time.perf_counter()
+            logins = [
+                asyncio.create_task(login_loop(client, username, stop, counts))
+                for _ in range(storm)
+            ]
+            await asyncio.sleep(1)  # let the storm fill the pools
+
+            latencies = []
+            for _ in range(SAMPLES):
+                sent = time.perf_counter()
+                (await client.get("/listings/")).raise_for_status()
+                latencies.append(time.perf_counter() - sent)
+
+            stop.set()
+            elapsed = time.perf_counter() - storm_start
+            await asyncio.gather(*logins)
+        finally:
+            with get_db_connection() as conn:
+                conn.execute("DELETE FROM users WHERE id = %s;", (user_id,))
+
+    percentiles = quantiles(latencies, n=100)
+    print(
+        json.dumps(
+            {
+                "p50": percentiles[49] * 1000,
+                "p99": percentiles[98] * 1000,
+                "logins/s": counts.get(200, 0) / elapsed,
+                "503s": counts.get(503, 0),
+            }
+        )
+    )
+
+
+def main():
+    storm = sys.argv[1] if len(sys.argv) > 1 else str(STORM)
+    runs = {}
+    for pool in ("shared", "dedicated"):
+        env = {
+            "BCRYPT_ROUNDS": "10",
+            **os.environ,
+            "BENCH_HASH_POOL": pool,
+            "BENCH_CHILD": "1",
+        }
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.login_storm", storm],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs[pool] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"{storm} concurrent logins, {SAMPLES} listing requests")
+    print(f"{'bcrypt pool':<12}{'p50 ms':>10}{'p99 ms':>10}{'logins/s':>10}{'503s':>8}")
+    for pool, run in runs.items():
+        print(
+            f"{pool:<12}{run['p50']:>10.1f}{run['p99']:>10.1f}"
+            f"{run['logins/s']:>10.1f}{run['503s']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    if os.getenv("BENCH_CHILD"):
+        asyncio.run(measure(int(sys.argv[1]) if len(sys.argv) > 1 else STORM))
+    else:
+        main()
@@ -0,0 +1,57 @@
+"""
+Microseconds per rate-limit check with counts kept in worker memory vs. in the
+shared rate_limits table, for requests spread over many client keys.
+
+Its counts in rate_limits are deleted afterwards.
+
+Run from backend/:
+    python -m benchmarks.ratelimit [checks]
+"""
+
+import random
+import sys
+import time
+
+CHECKS = 200000
+POSTGRES_CHECKS = 2000
+KEYS = 10000
+SCOPE = "benchmark"
+
+
+def measure(limit, keys: list[str]) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        try:
+            limit.check(key)
+        except Exception:
+            pass  # 429s are part of the cost
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main():
+    from app.util.db import get_db_connection
+    from app.util.ratelimit import MemoryStore, PostgresStore, RateLimit
+
+    checks = int(sys.argv[1]) if len(sys.argv) > 1 else CHECKS
+    rand = random.Random(1)
+    keys = [f"10.0.{i // 256}.{i % 256}" for i in range(KEYS)]
+    sample = rand.choices(keys, k=checks)
+
+    limit = RateLimit(SCOPE, limit=30, window=60)
+    limit.store = MemoryStore(limit.window)
+    memory = measure(limit, sample)
+
+    limit.store = PostgresStore(limit.window)
+    try:
+        postgres = measure(limit, sample[:POSTGRES_CHECKS])
+    finally:
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM rate_limits WHERE key LIKE %s;", (f"{SCOPE}:%",))
+
+    print(f"{'store':<10}{'checks':>10}{'us/check':>10}")
+    print(f"{'memory':<10}{checks:>10}{memory:>10.1f}")
+    print(f"{'postgres':<10}{POSTGRES_CHECKS:>10}{postgres:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
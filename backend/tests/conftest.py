@@ -0,0 +1,27 @@
+import os
+
+import psycopg
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# the app connects to DATABASE_URL on import, so nothing can be collected without it
+if not os.getenv("DATABASE_URL"):
+    collect_ignore_glob = ["test_*.py"]
+
+
+@pytest.fixture
+def db():
+    """a connection to DATABASE_URL, rolled back afterwards; skips if it's unreachable"""
+    from app.util.db import DATABASE_URL
+
+    try:
+        conn = psycopg.connect(DATABASE_URL)
+    except psycopg.OperationalError as e:
+        pytest.skip(f"database is unreachable: {e}")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,50 @@
+import os
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+pytestmark = pytest.mark.skipif(
+    not (os.getenv("JWT_ACCESS_SECRET") and os.getenv("JWT_REFRESH_SECRET")),
+    reason="JWT secrets are not set",
+)
+
+PASSWORD = "test-password"
+
+
+@pytest.fixture
+def username(db):
+    """a username to register, whose user is deleted afterwards"""
+    username = f"test-{uuid.uuid4().hex[:12]}"
+    yield username
+    db.execute("DELETE FROM users WHERE username = %s;", (username,))
+    db.commit()
+
+
+def post_with_cookie(client: TestClient, url: str, refresh_token: str):
+    client.cookies.clear()
+    client.cookies.set("refresh_token", refresh_token)
+    return client.post(url)
+
+
+def test_logout_revokes_tokens_refreshed_from(username: str):
+    # secure cookies are only sent over https
+    client = TestClient(app, base_url="https://testserver")
+    response = client.post(
+        "/auth/register", data={"username": username, "password": PASSWORD}
+    )
+    assert response.status_code == 201
+    original = response.cookies["refresh_token"]
+
+    response = post_with_cookie(client, "/auth/refresh", original)
+    assert response.status_code == 200
+    rotated = response.cookies["refresh_token"]
+    assert rotated != original
+
+    response = post_with_cookie(client, "/auth/logout", rotated)
+    assert response.status_code == 200
+
+    assert post_with_cookie(client, "/auth/refresh", rotated).status_code == 401
+    assert post_with_cookie(client, "/auth/refresh", original).status_code == 401
@@ -0,0 +1,89 @@
+import json
+import os
+import random
+from pathlib import Path
+
+from app.models.cron import ListingSource
+from app.util.cron import (
+    CATEGORY_RULES,
+    DEFAULT_CATEGORY,
+    FAANG_PLUS,
+    PRODUCT_ROLE_WORDS,
+    classify_listings,
+    classifyFaangPlus,
+    classifyJobCategory,
+    parse_listings,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+# category and FAANG+ flag of each listing in fixtures/listings.json, as classified
+# before the keyword rules were compiled into trie regexes; rewrite it with
+# UPDATE_GOLDEN=1 after an intended change to the rules
+GOLDEN = FIXTURES / "classifier_golden.json"
+
+CORPUS_SIZE = 300000
+FILLER = ["intern", "summer", "2026", "engineer", "team", "senior", "-", "/", "&"]
+
+
+def reference_category(title: str) -> str:
+    """classifies a title the way the rules read: plain substring checks, in order"""
+    title = title.lower()
+    for category, keywords in CATEGORY_RULES:
+        if any(keyword.lower() in title for keyword in keywords):
+            return category
+        if category == "Product Management" and (
+            "product" in title and any(word in title for word in PRODUCT_ROLE_WORDS)
+        ):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def make_corpus(size: int) -> list[str]:
+    """titles built from every keyword, overlapping, glued together and in any case"""
+    rand = random.Random(15)
+    words = [keyword for _, keywords in CATEGORY_RULES for keyword in keywords]
+    words += PRODUCT_ROLE_WORDS + ["product"] * 5 + FILLER
+    titles = []
+    for _ in range(size):
+        pieces = rand.choices(words, k=rand.randint(1, 5))
+        title = "".join(piece + rand.choice([" ", " ", "", ", "]) for piece in pieces)
+        if rand.random() < 0.2:
+            # cut into a keyword, so prefixes of keywords show up on their own
+            title = title[: rand.randint(1, len(title))]
+        titles.append(rand.choice([str.lower, str.upper, str.title])(title))
+    return titles
+
+
+def test_compiled_rules_match_substring_rules():
+    mismatches = [
+        (title, category, reference_category(title))
+        for title in make_corpus(CORPUS_SIZE)
+        if (category := classifyJobCategory({"title": title}))
+        != reference_category(title)
+    ]
+    assert mismatches[:10] == []
+
+
+def test_fixture_listings_match_golden():
+    source = ListingSource(name="fixture", urls=[])
+    with open(FIXTURES / "listings.json", "rb") as file:
+        listings, _ = parse_listings(file, source, stored={})
+    classify_listings(listings, categories={})
+    classified = {
+        str(listing.id): [listing.category, listing.faang_plus] for listing in listings
+    }
+
+    if os.getenv("UPDATE_GOLDEN") == "1":
+        lines = [f"  {json.dumps(id)}: {json.dumps(v)}" for id, v in classified.items()]
+        GOLDEN.write_text("{\n" + ",\n".join(sorted(lines)) + "\n}\n")
+
+    golden = json.loads(GOLDEN.read_text())
+    assert len(classified) == len(golden)
+    changed = {id: (golden[id], v) for id, v in classified.items() if golden[id] != v}
+    assert changed == {}
+
+
+def test_faang_plus_ignores_case_only():
+    assert classifyFaangPlus({"company_name": "NVIDIA"})
+    assert not classifyFaangPlus({"company_name": "Nvidia Corporation"})
+    assert all(name == name.lower() for name in FAANG_PLUS)
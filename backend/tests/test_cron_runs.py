@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+from threading import Event
+
+import pytest
+
+from app.models.cron import CronRunStatus
+from app.util import cron, jobs
+
+
+@pytest.fixture
+def run_ids(db):
+    """ids of cron runs made by the test, deleted afterwards"""
+    ids: list[int] = []
+    yield ids
+    db.execute("DELETE FROM cron_runs WHERE id = ANY(%s);", (ids,))
+    db.commit()
+
+
+def test_second_trigger_returns_the_queued_run(run_ids):
+    release = Event()
+    first, job = jobs.submit_run(lambda run_id: release.wait(5))
+    run_ids.append(first.id)
+    try:
+        second, second_job = jobs.submit_run(lambda run_id: None)
+        run_ids.append(second.id)
+        assert second.id == first.id
+        assert second_job is job
+    finally:
+        release.set()
+        job.result()
+
+    third, third_job = jobs.submit_run(lambda run_id: None)
+    run_ids.append(third.id)
+    third_job.result()
+    assert third.id != first.id
+
+
+def test_run_fails_if_the_lock_cannot_be_taken(run_ids, monkeypatch):
+    @contextmanager
+    def broken_lock():
+        raise ConnectionError("database went away")
+        yield
+
+    monkeypatch.setattr(cron, "ingest_lock", broken_lock)
+    run = jobs.create_run()
+    run_ids.append(run.id)
+    cron.run_ingest(run.id)
+
+    run = jobs.get_run(run.id)
+    assert run.status == CronRunStatus.FAILED
+    assert "database went away" in run.error
@@ -0,0 +1,123 @@
+import io
+import json
+from uuid import UUID
+
+import pytest
+
+from app.models.cron import ListingSource
+from app.util.cron import iter_json_array, parse_listings
+
+DOCUMENT = """ [
+  {"id": "a", "title": "Intern \\"SWE\\"", "locations": ["NYC", "Remote"], "n": 12},
+  1.5, -0.25e-3, 120, 3E+2, true, false, null, "s,]",
+  {"nested": {"x": [1, 2.75, {"y": -7}]}}, [], {}
+]
+"""
+
+
+class ChunkedReader(io.StringIO):
+    """reads at most size characters at a time, like a feed arriving in pieces"""
+
+    def __init__(self, text: str, size: int):
+        super().__init__(text)
+        self.size = size
+
+    def read(self, size: int | None = -1):
+        return super().read(
+            self.size if size is None or size < 0 else min(size, self.size)
+        )
+
+
+@pytest.mark.parametrize("size", range(1, len(DOCUMENT) + 1))
+def test_every_chunk_size_decodes_the_same(size: int):
+    items = list(iter_json_array(ChunkedReader(DOCUMENT, size)))
+    assert items == json.loads(DOCUMENT)
+
+
+@pytest.mark.parametrize("document", ["[1.5", '[{"a": 1}', '[{"a": 1', "{}", ""])
+def test_malformed_documents_are_rejected(document: str):
+    with pytest.raises(ValueError):
+        list(iter_json_array(ChunkedReader(document, 1)))
+
+
+def make_feed_listing(id: str, company: str, url: str, title: str) -> dict:
+    return {
+        "id": id,
+        "source": "Simplify",
+        "company_name": company,
+        "company_url": "https://example.com",
+        "title": title,
+        "active": True,
+        "date_updated": 1739574567,
+        "is_visible": True,
+        "date_posted": 1739133521,
+        "url": url,
+        "locations": ["Remote"],
+        "terms": ["Summer 2026"],
+        "sponsorship": "Other",
+    }
+
+
+SHARED = "99dd251d-e512-4482-b929-2d22e255accb"
+FEED = [
+    make_feed_listing(SHARED, "Acme", "https://example.com/1", "SWE Intern"),
+    make_feed_listing(SHARED, "Acme", "https://example.com/2", "SWE Intern"),
+    make_feed_listing(SHARED, "Initech", "https://example.com/1", "SWE Intern"),
+    # same source, company and URL as the first, told apart by title
+    make_feed_listing(SHARED, "Acme", "https://example.com/1", "ML Intern"),
+    make_feed_listing(
+        "1f0e8f1c-5a3b-4c5d-8e9f-0a1b2c3d4e5f", "Acme", "https://example.com/3", "PM"
+    ),
+]
+
+
+Stored = dict[UUID, tuple[str, str]]
+
+
+def parse_ids(feed: list[dict], stored: Stored) -> dict[tuple[str, str, str], str]:
+    file = io.BytesIO(json.dumps(feed).encode())
+    listings, _ = parse_listings(file, ListingSource(name="test", urls=[]), stored)
+    return {(l.company_name, l.url, l.title): str(l.id) for l in listings}
+
+
+def as_stored(ids: dict[tuple[str, str, str], str]) -> Stored:
+    """the rows an ingest of ids would leave behind"""
+    return {UUID(id): ("Simplify", url) for (_, url, _), id in ids.items()}
+
+
+def test_derived_ids_do_not_depend_on_feed_order():
+    ids = parse_ids(FEED, {})
+    assert len(set(ids.values())) == len(FEED)
+    # the first in canonical order keeps the upstream ID
+    assert ids[("Acme", "https://example.com/1", "ML Intern")] == SHARED
+    assert ids[("Acme", "https://example.com/3", "PM")] == FEED[-1]["id"]
+    assert parse_ids(FEED[::-1], {}) == ids
+    assert parse_ids(FEED[2:] + FEED[:2], {}) == ids
+
+
+def test_parse_counts_derived_ids():
+    file = io.BytesIO(json.dumps(FEED).encode())
+    _, derived = parse_listings(file, ListingSource(name="test", urls=[]), {})
+    assert derived == 3
+
+
+def test_stored_listing_keeps_the_upstream_id():
+    stored = {UUID(SHARED): ("Simplify", "https://example.com/2")}
+    ids = parse_ids(FEED, stored)
+    assert ids[("Acme", "https://example.com/2", "SWE Intern")] == SHARED
+    assert parse_ids(FEED[::-1], stored) == ids
+
+
+def test_ids_survive_gaining_and_losing_partners():
+    alone = parse_ids(FEED[1:2], {})
+    assert list(alone.values()) == [SHARED]
+
+    # a listing sorting before it joins: the stored one keeps its ID
+    joined = parse_ids(FEED[:2], as_stored(alone))
+    assert joined[("Acme", "https://example.com/2", "SWE Intern")] == SHARED
+    newcomer = joined[("Acme", "https://example.com/1", "SWE Intern")]
+    assert newcomer != SHARED
+
+    # the original leaves: the newcomer keeps its derived ID
+    left = parse_ids(FEED[:1], as_stored(joined))
+    assert left == {("Acme", "https://example.com/1", "SWE Intern"): newcomer}
@@ -0,0 +1,103 @@
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models.cron import IngestStrategy
+from app.models.listings import ListingRecord
+from app.util import cron
+from app.util.cron import (
+    get_classifier_rules,
+    preview_classifier,
+    write_listings_copy,
+    write_listings_executemany,
+)
+
+FEED = "test-feed"
+
+WRITERS = {
+    IngestStrategy.COPY: write_listings_copy,
+    IngestStrategy.EXECUTEMANY: write_listings_executemany,
+}
+
+
+def make_listings(cur, count: int) -> list[ListingRecord]:
+    cur.execute(
+        "INSERT INTO companies (name, url) VALUES (%s, %s) RETURNING id;",
+        (f"Test Company {uuid.uuid4()}", "https://example.com"),
+    )
+    company_id = cur.fetchone()[0]
+    now = datetime.now(timezone.utc)
+    return [
+        ListingRecord(
+            id=uuid.uuid4(),
+            source="Test",
+            title=f"Software Engineer Intern {i}",
+            active=True,
+            date_updated=now,
+            is_visible=True,
+            date_posted=now,
+            url=f"https://example.com/{i}",
+            locations=["Remote"],
+            terms=["Summer 2026"],
+            sponsorship="Other",
+            company_name="Test Company",
+            company_url="https://example.com",
+            feed=FEED,
+            category="Software Engineering",
+            faang_plus=False,
+            classifier_version="test",
+            company_id=company_id,
+        )
+        for i in range(count)
+    ]
+
+
+def current_count(cur) -> int:
+    cur.execute(
+        "SELECT COUNT(*) FROM listings WHERE feed = %s AND NOT archived;", (FEED,)
+    )
+    return cur.fetchone()[0]
+
+
+@pytest.mark.parametrize("strategy", list(IngestStrategy))
+def test_empty_feed_archives_its_listings(db, strategy: IngestStrategy):
+    write = WRITERS[strategy]
+    with db.cursor() as cur:
+        listings = make_listings(cur, 3)
+        first = write(cur, listings, [FEED], 1)
+        assert first.inserted == 3
+        assert current_count(cur) == 3
+        cur.execute("DROP TABLE IF EXISTS tmp_listings, tmp_listing_ids;")
+
+        summary = write(cur, [], [FEED], 2)
+        assert summary.model_dump() == {
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "archived": 3,
+            "restored": 0,
+        }
+        assert current_count(cur) == 0
+        cur.execute(
+            "SELECT COUNT(*) FROM listing_tombstones WHERE id = ANY(%s) AND version = 2;",
+            ([l.id for l in listings],),
+        )
+        assert cur.fetchone()[0] == 3
+
+
+def test_classifier_preview_counts_current_listings(db, monkeypatch):
+    # run the preview in this test's transaction, to see its uncommitted listings
+    monkeypatch.setattr(cron, "get_db_connection", lambda: nullcontext(db))
+    with db.cursor() as cur:
+        listings = make_listings(cur, 3)
+        write_listings_copy(cur, listings, [FEED], 1)
+        cur.execute("DROP TABLE IF EXISTS tmp_listings, tmp_listing_ids;")
+        assert write_listings_copy(cur, listings[:1], [FEED], 2).archived == 2
+        cur.execute("SELECT COUNT(*) FROM listings WHERE NOT archived;")
+        current = cur.fetchone()[0]
+
+    preview = preview_classifier(get_classifier_rules())
+    assert sum(preview.current.values()) == current
+    assert sum(preview.proposed.values()) == current
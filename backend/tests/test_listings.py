@@ -0,0 +1,81 @@
+import gc
+import threading
+import uuid
+from contextlib import nullcontext
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.util import listings
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/listings/?page=2&page_size=100",
+        "/listings/?pageSize=100&page=2",
+        "/listings/facets?page=1",
+        "/listings/export?page_size=100",
+    ],
+)
+def test_unknown_query_parameters_are_rejected(url: str):
+    response = client.get(url)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "extra_forbidden"
+
+
+def chunks():
+    yield b"chunk"
+
+
+def test_exports_past_the_slots_are_turned_away(monkeypatch):
+    monkeypatch.setattr(listings, "export_slots", threading.BoundedSemaphore(1))
+    first = listings.hold_export_slot(chunks())
+    assert first is not None
+    assert listings.hold_export_slot(chunks()) is None
+
+    response = client.get("/listings/export")
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+    # a stream that never started gives its slot back once it's dropped
+    del first
+    gc.collect()
+    # and a finished one as soon as it ends
+    for _ in range(3):
+        assert client.get("/listings/export").status_code == 200
+
+
+def test_syncs_from_before_pruned_tombstones_must_start_over(db, monkeypatch):
+    # run in this test's transaction, rolled back afterwards
+    monkeypatch.setattr(listings, "get_db_connection", lambda: nullcontext(db))
+    old, recent = uuid.uuid4(), uuid.uuid4()
+    with db.cursor() as cur:
+        cur.execute("SELECT version FROM listings_state;")
+        # a client synced at a version after 0, which is a sync from scratch
+        version = cur.fetchone()[0] + 1
+        cur.execute(
+            """
+            INSERT INTO listing_tombstones (id, version, removed_at) VALUES
+                (%s, %s, NOW() - make_interval(days => %s)), (%s, %s, NOW());
+            """,
+            (
+                old,
+                version + 1,
+                listings.TOMBSTONE_RETENTION_DAYS + 1,
+                recent,
+                version + 2,
+            ),
+        )
+        cur.execute("UPDATE listings_state SET version = %s;", (version + 2,))
+
+    assert listings.prune_tombstones_in_db() >= 1
+    assert listings.get_listing_changes_from_db(version) is None
+    assert client.get(f"/listings/changes?since={version}").status_code == 410
+
+    changes = listings.get_listing_changes_from_db(version + 1)
+    assert changes is not None and changes.removed == [recent]
+    assert client.get("/listings/changes?since=0").json()["removed"] == []
@@ -0,0 +1,61 @@
+import asyncio
+
+from app.main import app
+from app.models.auth import User
+from app.routers.images import profile_image_limit
+from app.util import ratelimit
+
+BODY = b'--x\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'
+
+
+def put_profile_image() -> tuple[int, bool]:
+    """sends an upload straight to the app, returning its status and if the body was read"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "PUT",
+        "scheme": "http",
+        "path": "/images/profile",
+        "raw_path": b"/images/profile",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            (b"authorization", b"Bearer token"),
+            (b"content-type", b"multipart/form-data; boundary=x"),
+        ],
+        "client": ("127.0.0.1", 1),
+        "server": ("test", 80),
+    }
+    read = False
+    sent = []
+
+    async def receive():
+        nonlocal read
+        if read:
+            return {"type": "http.disconnect"}
+        read = True
+        return {"type": "http.request", "body": BODY + b"\r\n--x--\r\n"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], read
+
+
+def test_upload_over_the_limit_is_not_read(monkeypatch):
+    monkeypatch.setattr(
+        ratelimit, "get_user", lambda token: User(id=1, username="u", admin=False)
+    )
+    monkeypatch.setattr(profile_image_limit, "limit", 1)
+    monkeypatch.setattr(
+        profile_image_limit, "store", ratelimit.MemoryStore(profile_image_limit.window)
+    )
+
+    status, read = put_profile_image()
+    assert status != 429 and read
+
+    status, read = put_profile_image()
+    assert status == 429 and not read
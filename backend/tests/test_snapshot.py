@@ -0,0 +1,19 @@
+from app.util import snapshot
+from app.util.snapshot import Snapshot
+
+
+def test_rendered_bodies_are_bounded_by_size(monkeypatch):
+    monkeypatch.setattr(snapshot, "get_data_version", lambda: 1)
+    monkeypatch.setattr(snapshot, "MAX_RENDERED_BYTES", 1000)
+    monkeypatch.setattr(snapshot, "MAX_RENDERED_BODY_BYTES", 300)
+    cached = Snapshot(lambda: "value")
+
+    for i in range(20):
+        cached.render(f"/page?pageSize={i}", lambda value: b"x" * 200)
+    assert cached.rendered_bytes == sum(len(b) for b in cached.rendered.values())
+    assert cached.rendered_bytes <= 1000
+    assert "/page?pageSize=19" in cached.rendered
+
+    # too large to keep, but still served
+    assert cached.render("/page?pageSize=1000", lambda value: b"x" * 301) == b"x" * 301
+    assert "/page?pageSize=1000" not in cached.rendered
@@ -1,3 +1,6 @@
+-- trigram matching for typo-tolerant search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ============================
 -- Users
 -- ============================
@@ -8,6 +11,31 @@ CREATE TABLE users (
     admin BOOLEAN NOT NULL DEFAULT FALSE
 );
 
+-- ============================
+-- Revoked Tokens
+-- ============================
+-- refresh tokens revoked on logout, kept until they expire: by token ID (jti), and by
+-- the ID of their login (sid) to revoke every token refreshed from the same login
+CREATE TABLE revoked_tokens (
+    jti UUID PRIMARY KEY,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX revoked_tokens_expires_at_idx ON revoked_tokens (expires_at);
+
+-- ============================
+-- Rate Limits
+-- ============================
+-- request counts per rate-limit key and time bucket, when RATE_LIMIT_STORE=postgres;
+-- unlogged, as losing them in a crash only resets the limits
+CREATE UNLOGGED TABLE rate_limits (
+    key TEXT PRIMARY KEY,
+    bucket BIGINT NOT NULL,
+    count INT NOT NULL,
+    previous INT NOT NULL,  -- count of the bucket before
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
 -- ============================
 -- Profiles
 -- ============================
@@ -50,11 +78,27 @@ CREATE TABLE companies (
     logo_url TEXT
 );
 
+CREATE INDEX companies_name_trgm_idx ON companies USING GIN (name gin_trgm_ops);
+
+-- last logo scrape per company, so missing logos are retried with backoff
+CREATE TABLE company_logo_attempts (
+    company_id INT PRIMARY KEY REFERENCES companies(id) ON DELETE CASCADE,
+    status TEXT NOT NULL,  -- found, missing (no logo on the page) or failed (fetch error)
+    attempts INT NOT NULL DEFAULT 1,
+    last_attempt TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    next_retry TIMESTAMPTZ,  -- NULL once found
+    content_hash TEXT  -- hash of the last page fetched
+);
+
+CREATE INDEX company_logo_attempts_next_retry_idx ON company_logo_attempts (next_retry);
+
 -- ============================
 -- Listings
 -- ============================
+-- split into current listings and the archive of those no longer in any feed,
+-- so everyday queries only scan listings_current
 CREATE TABLE listings (
-    id UUID PRIMARY KEY,
+    id UUID NOT NULL,
     source TEXT NOT NULL,
     title TEXT NOT NULL,
     active BOOLEAN NOT NULL,
@@ -67,16 +111,166 @@ CREATE TABLE listings (
     sponsorship TEXT NOT NULL,
     category TEXT NOT NULL,
     faang_plus BOOLEAN NOT NULL,
-    company_id INT NOT NULL REFERENCES companies(id) ON DELETE CASCADE
+    company_id INT NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    search_vector TSVECTOR NOT NULL DEFAULT '',
+    classifier_version TEXT NOT NULL DEFAULT '',  -- rules category and faang_plus were set by
+    content_hash TEXT NOT NULL DEFAULT '',  -- hash of the feed's columns, as of the last ingest
+    feed TEXT NOT NULL DEFAULT 'simplify-summer',  -- name of the ListingSource it came from
+    archived BOOLEAN NOT NULL DEFAULT FALSE,  -- dropped from its feed; kept for history and favorites
+    version BIGINT NOT NULL DEFAULT 0,  -- listings_state.version when last written
+    PRIMARY KEY (id, archived)
+) PARTITION BY LIST (archived);
+
+CREATE TABLE listings_current PARTITION OF listings FOR VALUES IN (FALSE);
+CREATE TABLE listings_archive PARTITION OF listings FOR VALUES IN (TRUE);
+
+-- keyset pagination orders for GET /listings
+CREATE INDEX listings_date_posted_id_idx ON listings (date_posted DESC, id DESC);
+CREATE INDEX listings_date_updated_id_idx ON listings (date_updated DESC, id DESC);
+CREATE INDEX listings_company_id_idx ON listings (company_id);
+
+-- filters for GET /listings
+CREATE INDEX listings_category_date_posted_idx ON listings (category, date_posted DESC, id DESC);
+CREATE INDEX listings_sponsorship_idx ON listings (sponsorship);
+CREATE INDEX listings_active_date_posted_idx ON listings (date_posted DESC, id DESC) WHERE active;
+CREATE INDEX listings_faang_plus_date_posted_idx ON listings (date_posted DESC, id DESC) WHERE faang_plus;
+CREATE INDEX listings_locations_idx ON listings USING GIN (locations);
+CREATE INDEX listings_terms_idx ON listings USING GIN (terms);
+
+-- delta sync for GET /listings/changes
+CREATE INDEX listings_version_idx ON listings (version);
+
+-- search for GET /listings?q=
+CREATE INDEX listings_search_vector_idx ON listings USING GIN (search_vector);
+CREATE INDEX listings_title_trgm_idx ON listings USING GIN (title gin_trgm_ops);
+
+-- keeps search_vector in sync with the title and company name
+CREATE FUNCTION listings_search_vector_update() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', NEW.title), 'A')
+        || setweight(to_tsvector('english', COALESCE(
+            (SELECT name FROM companies WHERE id = NEW.company_id), ''
+        )), 'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER listings_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, company_id ON listings
+FOR EACH ROW EXECUTE FUNCTION listings_search_vector_update();
+
+-- ============================
+-- Listing Facets
+-- ============================
+-- counts per filter value among current listings, refreshed at the end of each ingest
+CREATE MATERIALIZED VIEW listing_facets AS
+    SELECT 'category' AS facet, category AS value, COUNT(*) AS count
+    FROM listings
+    WHERE NOT archived
+    GROUP BY category
+    UNION ALL
+    SELECT 'terms', term, COUNT(*)
+    FROM listings CROSS JOIN unnest(terms) AS term
+    WHERE NOT archived
+    GROUP BY term
+    UNION ALL
+    SELECT 'sponsorship', sponsorship, COUNT(*)
+    FROM listings
+    WHERE NOT archived
+    GROUP BY sponsorship
+    UNION ALL
+    SELECT 'faang_plus', faang_plus::TEXT, COUNT(*)
+    FROM listings
+    WHERE NOT archived
+    GROUP BY faang_plus
+    UNION ALL
+    SELECT 'company', c.name, COUNT(*)
+    FROM listings l
+    JOIN companies c ON l.company_id = c.id
+    WHERE NOT l.archived
+    GROUP BY c.name;
+
+-- required to refresh concurrently, so reads aren't blocked during ingest
+CREATE UNIQUE INDEX listing_facets_facet_value_idx ON listing_facets (facet, value);
+
+-- ============================
+-- Listings State
+-- ============================
+-- single row; version is bumped by every committed change to listings
+CREATE TABLE listings_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    classifier_version TEXT NOT NULL DEFAULT '',  -- rules every listing is classified by
+    tombstones_pruned_version BIGINT NOT NULL DEFAULT 0  -- tombstones up to it were pruned
+);
+
+INSERT INTO listings_state DEFAULT VALUES;
+
+-- ============================
+-- Listing Tombstones
+-- ============================
+-- listings archived by ingest or deleted by admins, with the version they were removed at;
+-- ingest prunes those removed longer ago than the retention window
+CREATE TABLE listing_tombstones (
+    id UUID PRIMARY KEY,
+    version BIGINT NOT NULL,
+    removed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX listing_tombstones_version_idx ON listing_tombstones (version);
+CREATE INDEX listing_tombstones_removed_at_idx ON listing_tombstones (removed_at);
+
+-- ============================
+-- Ingest Sources
+-- ============================
+-- upstream feed state as of the last successful ingest, to skip unchanged feeds
+CREATE TABLE ingest_sources (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    content_hash TEXT NOT NULL,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ============================
+-- Cron Runs
+-- ============================
+-- ingest runs started by GET /cron/, with their progress and result
+CREATE TABLE cron_runs (
+    id BIGSERIAL PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, succeeded, failed or skipped
+    stage TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    result JSONB,
+    error TEXT
+);
+
+-- what each stage of a cron run took, for GET /cron/runs to spot regressions
+CREATE TABLE cron_run_stages (
+    run_id BIGINT NOT NULL REFERENCES cron_runs(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    wall_seconds DOUBLE PRECISION NOT NULL,
+    cpu_seconds DOUBLE PRECISION NOT NULL,
+    peak_memory BIGINT,  -- bytes, only if memory was traced
+    max_rss BIGINT NOT NULL,  -- bytes
+    rows_in INT,
+    rows_out INT,
+    PRIMARY KEY (run_id, stage)
 );
 
 -- ============================
 -- Favorites
 -- ============================
+-- listing_archived follows the listing between partitions through ON UPDATE CASCADE
 CREATE TABLE favorites (
     id SERIAL PRIMARY KEY,
     user_id INT REFERENCES users(id) ON DELETE CASCADE,
-    listing_id UUID REFERENCES listings(id) ON DELETE CASCADE
+    listing_id UUID NOT NULL,
+    listing_archived BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (listing_id, listing_archived) REFERENCES listings(id, archived)
+        ON UPDATE CASCADE ON DELETE CASCADE
 );
 
 ALTER TABLE favorites